@@ -38,16 +38,85 @@ evaluate2str
 """
 
 
+# third-party modules
+from collections import namedtuple
+from itertools import chain
+from math import sqrt
+import numpy as np
+
+# `numba` is optional: when available, the counting kernel is
+# JIT-compiled to native code; otherwise the NumPy path is used
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # own modules
 from reader import Corpus
 
 
+# fixed-shape result cells (cheaper to build and to flatten than
+# dicts, while still allowing field access by name)
+ClassResults = namedtuple(
+    'ClassResults', ['TP', 'TN', 'FP', 'FN', 'PPV', 'TPR', 'F1'])
+MacroResults = namedtuple('MacroResults', ['PPV', 'TPR', 'F1'])
+OverallResults = namedtuple('OverallResults', ['F1'])
+
+# the selection criteria are fixed, so the tag list and the derived
+# constants are folded at import time (macro averages multiply by the
+# reciprocal instead of dividing)
+_TAGS = (
+    'ABDOMINAL',
+    'ADVANCED-CAD',
+    'ALCOHOL-ABUSE',
+    'ASP-FOR-MI',
+    'CREATININE',
+    'DIETSUPP-2MOS',
+    'DRUG-ABUSE',
+    'ENGLISH',
+    'HBA1C',
+    'KETO-1YR',
+    'MAJOR-DIABETES',
+    'MAKES-DECISIONS',
+    'MI-6MOS',
+)
+_N_TAGS = len(_TAGS)
+_INV_N_TAGS = 1.0 / _N_TAGS
+
+# one-entry memoization cache for `evaluate` (reports often evaluate
+# the same pair of corpora several times in a row); the label bytes act
+# as the invalidation token, since corpora are mutable via `set_labels`
+_CACHE = {'key': None, 'metrics': None}
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _tp_tn_fp_fn_jit(t, p):
+        tp = tn = fp = fn = 0
+        for i in range(t.shape[0]):
+            if t[i] == 1:
+                if p[i] == 1:
+                    tp += 1
+                else:
+                    fn += 1
+            else:
+                if p[i] == 1:
+                    fp += 1
+                else:
+                    tn += 1
+        return (tp, tn, fp, fn)
+else:
+    _tp_tn_fp_fn_jit = None
+
+
 def tp_tn_fp_fn(true, pred):
     r"""
     It calculates the true/false positives/negatives.
 
     It is expected to be a binary classification problem. That is the
-    labels are 0 or 1.
+    labels are 0 or 1. The labels are encoded, per sample, into a 2-bit
+    code `2*true + pred` and the four counts are obtained with a single
+    vectorized `numpy.bincount` pass.
 
     True Positive (TP) when:
         (true == 1) and (pred == 1)
@@ -77,19 +146,15 @@ def tp_tn_fp_fn(true, pred):
         Number of false negatives.
 
     """
-    tp = tn = fp = fn = 0
-    for t, p in zip(true, pred):
-        assert (t == 0) or (t == 1)
-        assert (p == 0) or (p == 1)
-        if (t == 1) and (p == 1):
-            tp += 1
-        elif (t == 0) and (p == 0):
-            tn += 1
-        elif (t == 0) and (p == 1):
-            fp += 1
-        elif (t == 1) and (p == 0):
-            fn += 1
-    return (tp, tn, fp, fn)
+    t = np.asarray(true, dtype=np.uint8)
+    p = np.asarray(pred, dtype=np.uint8)
+    # single up-front validation (instead of per-element asserts)
+    e = 'Labels are expected to be binary (0 or 1)!'
+    assert bool(((t | p) <= 1).all()), e
+    if _tp_tn_fp_fn_jit is not None:
+        return _tp_tn_fp_fn_jit(t, p)
+    c = np.bincount((t << 1) | p, minlength=4)
+    return (int(c[3]), int(c[0]), int(c[1]), int(c[2]))
 
 
 def tpr(tp, tn, fp, fn):
@@ -115,11 +180,8 @@ def tpr(tp, tn, fp, fn):
         True positive rate.
 
     """
-    try:
-        tpr = tp / (tp + fn)
-    except ZeroDivisionError:
-        tpr = 0.0
-    return tpr
+    den = tp + fn
+    return tp / den if den else 0.0
 
 
 def tnr(tp, tn, fp, fn):
@@ -145,11 +207,8 @@ def tnr(tp, tn, fp, fn):
         True negative rate.
 
     """
-    try:
-        tnr = tn / (tn + fp)
-    except ZeroDivisionError:
-        tnr = 0.0
-    return tnr
+    den = tn + fp
+    return tn / den if den else 0.0
 
 
 def fpr(tp, tn, fp, fn):
@@ -175,11 +234,8 @@ def fpr(tp, tn, fp, fn):
         False positive rate.
 
     """
-    try:
-        fpr = fp / (fp + tn)
-    except ZeroDivisionError:
-        fpr = 0.0
-    return fpr
+    den = fp + tn
+    return fp / den if den else 0.0
 
 
 def fnr(tp, tn, fp, fn):
@@ -205,11 +261,8 @@ def fnr(tp, tn, fp, fn):
         False negative rate.
 
     """
-    try:
-        fnr = fn / (fn + tp)
-    except ZeroDivisionError:
-        fnr = 0.0
-    return fnr
+    den = fn + tp
+    return fn / den if den else 0.0
 
 
 def ppv(tp, tn, fp, fn):
@@ -235,11 +288,8 @@ def ppv(tp, tn, fp, fn):
         Positive predicitive value.
 
     """
-    try:
-        ppv = tp / (tp + fp)
-    except ZeroDivisionError:
-        ppv = 0.0
-    return ppv
+    den = tp + fp
+    return tp / den if den else 0.0
 
 
 def npv(tp, tn, fp, fn):
@@ -263,11 +313,8 @@ def npv(tp, tn, fp, fn):
         Negative predicitive value.
 
     """
-    try:
-        npv = tn / (tn + fn)
-    except ZeroDivisionError:
-        npv = 0.0
-    return npv
+    den = tn + fn
+    return tn / den if den else 0.0
 
 
 def acc(tp, tn, fp, fn):
@@ -291,11 +338,8 @@ def acc(tp, tn, fp, fn):
         Accuracy.
 
     """
-    try:
-        acc = (tp + tn) / (tp + tn + fp + fn)
-    except ZeroDivisionError:
-        acc = 0.0
-    return acc
+    den = tp + tn + fp + fn
+    return (tp + tn) / den if den else 0.0
 
 
 def f1(tp, tn, fp, fn):
@@ -319,13 +363,10 @@ def f1(tp, tn, fp, fn):
         F1-score.
 
     """
-    try:
-        precision = tp / (tp + fp)
-        recall = tp / (tp + fn)
-        f1 = 2 * (precision * recall) / (precision + recall)
-    except ZeroDivisionError:
-        f1 = 0.0
-    return f1
+    # algebraically equivalent to the harmonic mean of precision and
+    # recall, using a single division
+    den = 2 * tp + fp + fn
+    return (2 * tp) / den if den else 0.0
 
 
 def mcc(tp, tn, fp, fn):
@@ -349,13 +390,11 @@ def mcc(tp, tn, fp, fn):
         Matthews correlation coefficient.
 
     """
-    try:
-        num = (tp * tn) - (fp * fn)
-        den = ((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)) ** 0.5
-        mcc = num / den
-    except ZeroDivisionError:
-        mcc = 0.0
-    return mcc
+    num = (tp * tn) - (fp * fn)
+    # the factored form keeps the intermediates in double precision
+    # (the product of the four sums can overflow 64-bit integers)
+    den = sqrt(tp + fp) * sqrt(tp + fn) * sqrt(tn + fp) * sqrt(tn + fn)
+    return num / den if den else 0.0
 
 
 def dor(tp, tn, fp, fn):
@@ -379,11 +418,31 @@ def dor(tp, tn, fp, fn):
         Diagnostic odds ratio.
 
     """
-    try:
-        dor = (tp * tn) / (fp * fn)
-    except ZeroDivisionError:
-        dor = 0.0
-    return dor
+    den = fp * fn
+    return (tp * tn) / den if den else 0.0
+
+
+def _label_matrix(corpus, tags):
+    r"""
+    Stacks the labels of a `Corpus` into a (n_tags, n_patients) matrix.
+
+    The corpus bulk fast-path `Corpus.get_label_matrix` is used, so the
+    patients are traversed only once.
+
+    Parameters
+    ----------
+    corpus : Corpus
+        The corpus to fetch the labels from.
+    tags : list
+        The tags (one matrix row per tag).
+
+    Returns
+    -------
+    matrix : numpy.ndarray
+        A (n_tags, n_patients) `numpy.uint8` matrix with the labels.
+
+    """
+    return corpus.get_label_matrix(tags=tags).T
 
 
 def evaluate(true, pred):
@@ -407,7 +466,8 @@ def evaluate(true, pred):
         The metrics `dict` contain the number of files/patients found,
         the TP, TN, FP, FN, precision, recall, and f1-score for each of
         the two classes: "met" and "not met". Also, overall, micro- and
-        macro-averaged scores are calculated.
+        macro-averaged scores are calculated. Each cell is a namedtuple
+        (`ClassResults`, `MacroResults`, or `OverallResults`).
 
     Example
     -------
@@ -418,149 +478,156 @@ def evaluate(true, pred):
     >>> true = Corpus(os.path.join(REPO, 'data', 'n2c2', 'train'))
     >>> pred = Corpus(os.path.join(REPO, 'data', 'n2c2', 'train'))
     >>> metrics = evaluate(true, pred)
-    >>> print(metrics['micro']['overall']['F1'])
+    >>> print(metrics['micro']['overall'].F1)
     1.0
     >>>
 
     """
-    # consistency check
-    assert isinstance(true, Corpus) and isinstance(pred, Corpus)
-    # the two corpus have the same patients? hope so!
-    assert true.get_patients() == pred.get_patients()
-    # auxiliar functions
-    def aux_dict():
-        return {
-            'met': dict(),
-            'not met': dict(),
-            'overall': dict(),
-        }
-    def invert(elems):
-         return [int(not elem) for elem in elems]
+    # consistency check (skipped with `python -O`; the full patient
+    # list comparison is O(n) per call, so it only runs in debug mode)
+    if __debug__:
+        assert isinstance(true, Corpus) and isinstance(pred, Corpus)
+        # the two corpus have the same patients? hope so!
+        assert true.get_patients() == pred.get_patients()
     # tags
-    tags = [
-        'ABDOMINAL',
-        'ADVANCED-CAD',
-        'ALCOHOL-ABUSE',
-        'ASP-FOR-MI',
-        'CREATININE',
-        'DIETSUPP-2MOS',
-        'DRUG-ABUSE',
-        'ENGLISH',
-        'HBA1C',
-        'KETO-1YR',
-        'MAJOR-DIABETES',
-        'MAKES-DECISIONS',
-        'MI-6MOS',
-    ]
-    n_tags = len(tags)
+    tags = _TAGS
     # how many patients are?
-    patients = true.get_patients()
-    n_patients = len(patients)
+    n_patients = len(true.get_patients())
     # initialize `metrics`
     metrics = {
         'patients': n_patients,
-        'tags': {tag: aux_dict() for tag in tags},
-        'micro': aux_dict(),
-        'macro': aux_dict(),
+        'tags': dict(),
+        'micro': dict(),
+        'macro': dict(),
     }
     # tags
+    # stack the labels of all the tags into (n_tags, n_patients)
+    # matrices (one row per tag, each tag fetched only once)
+    T = _label_matrix(true, tags)
+    P = _label_matrix(pred, tags)
+    # memoization: if the same pair of corpora is re-evaluated with
+    # unchanged labels the previous result is returned directly
+    key = (id(true), id(pred), T.tobytes(), P.tobytes())
+    if _CACHE['key'] == key:
+        return _CACHE['metrics']
+    # per-tag confusion counts: each (true, pred) pair is packed into a
+    # 2-bit code so the four counts of a tag come from a single
+    # bincount pass over its row (instead of four separate reductions)
+    code = (T << 1) | P
+    counts = np.stack(
+        [np.bincount(row, minlength=4) for row in code]
+    ).astype(np.int64)
+    tn_arr = counts[:, 0]
+    fp_arr = counts[:, 1]
+    fn_arr = counts[:, 2]
+    tp_arr = counts[:, 3]
+    # auxiliar function (vectorized safe-divide, zero when undefined)
+    def safe_divide(num, den):
+        return np.divide(num, den, out=np.zeros(_N_TAGS), where=den > 0)
+    # per-tag scores for all the tags at once (one fused divide per
+    # score instead of 13 Python-level calls); the 'not met' scores
+    # come from the swapped arrays by symmetry
+    m_ppv = safe_divide(tp_arr, tp_arr + fp_arr)
+    m_tpr = safe_divide(tp_arr, tp_arr + fn_arr)
+    m_f1 = safe_divide(2 * tp_arr, 2 * tp_arr + fp_arr + fn_arr)
+    n_ppv = safe_divide(tn_arr, tn_arr + fn_arr)
+    n_tpr = safe_divide(tn_arr, tn_arr + fp_arr)
+    n_f1 = safe_divide(2 * tn_arr, 2 * tn_arr + fn_arr + fp_arr)
     # go through for each tag
-    for tag in tags:
+    for i, tag in enumerate(tags):
         # --- met ---
-        # get true/pred labels
-        true_labels = true.get_labels(tag=tag)
-        pred_labels = pred.get_labels(tag=tag)
-        tp, tn, fp, fn = tp_tn_fp_fn(true_labels, pred_labels)
-        metrics['tags'][tag]['met']['TP'] = tp
-        metrics['tags'][tag]['met']['TN'] = tn
-        metrics['tags'][tag]['met']['FP'] = fp
-        metrics['tags'][tag]['met']['FN'] = fn
-        metrics['tags'][tag]['met']['PPV'] = ppv(tp, tn, fp, fn)
-        metrics['tags'][tag]['met']['TPR'] = tpr(tp, tn, fp, fn)
-        metrics['tags'][tag]['met']['F1'] = f1(tp, tn, fp, fn)
+        tp = int(tp_arr[i])
+        tn = int(tn_arr[i])
+        fp = int(fp_arr[i])
+        fn = int(fn_arr[i])
+        met = ClassResults(
+            tp, tn, fp, fn,
+            float(m_ppv[i]), float(m_tpr[i]), float(m_f1[i]))
         # --- not met ---
-        # get true/pred labels
-        true_labels = invert(true.get_labels(tag=tag))
-        pred_labels = invert(pred.get_labels(tag=tag))
-        tp, tn, fp, fn = tp_tn_fp_fn(true_labels, pred_labels)
-        metrics['tags'][tag]['not met']['TP'] = tp
-        metrics['tags'][tag]['not met']['TN'] = tn
-        metrics['tags'][tag]['not met']['FP'] = fp
-        metrics['tags'][tag]['not met']['FN'] = fn
-        metrics['tags'][tag]['not met']['PPV'] = ppv(tp, tn, fp, fn)
-        metrics['tags'][tag]['not met']['TPR'] = tpr(tp, tn, fp, fn)
-        metrics['tags'][tag]['not met']['F1'] = f1(tp, tn, fp, fn)
+        # inverting both label vectors swaps TP with TN and FP with FN,
+        # so the counts are derived by symmetry (no recomputation)
+        nmet = ClassResults(
+            tn, tp, fn, fp,
+            float(n_ppv[i]), float(n_tpr[i]), float(n_f1[i]))
         # --- overall ---
-        metrics['tags'][tag]['overall']['F1'] = (
-            metrics['tags'][tag]['met']['F1'] +
-            metrics['tags'][tag]['not met']['F1']
-        ) / 2
+        metrics['tags'][tag] = {
+            'met': met,
+            'not met': nmet,
+            'overall': OverallResults((met.F1 + nmet.F1) * 0.5),
+        }
     # === micro-averaged ===
     # --- met ---
-    tp = tn = fp = fn = 0
-    for tag in tags:
-        tp += metrics['tags'][tag]['met']['TP']
-        tn += metrics['tags'][tag]['met']['TN']
-        fp += metrics['tags'][tag]['met']['FP']
-        fn += metrics['tags'][tag]['met']['FN']
-    metrics['micro']['met']['TP'] = tp
-    metrics['micro']['met']['TN'] = tn
-    metrics['micro']['met']['FP'] = fp
-    metrics['micro']['met']['FN'] = fn
-    metrics['micro']['met']['PPV'] = ppv(tp, tn, fp, fn)
-    metrics['micro']['met']['TPR'] = tpr(tp, tn, fp, fn)
-    metrics['micro']['met']['F1'] = f1(tp, tn, fp, fn)
+    # a single reduction over the counts matrix yields all four sums
+    tn, fp, fn, tp = (int(v) for v in counts.sum(axis=0))
+    met = ClassResults(
+        tp, tn, fp, fn,
+        ppv(tp, tn, fp, fn), tpr(tp, tn, fp, fn), f1(tp, tn, fp, fn))
     # --- not met ---
-    tp = tn = fp = fn = 0
-    for tag in tags:
-        tp += metrics['tags'][tag]['not met']['TP']
-        tn += metrics['tags'][tag]['not met']['TN']
-        fp += metrics['tags'][tag]['not met']['FP']
-        fn += metrics['tags'][tag]['not met']['FN']
-    metrics['micro']['not met']['TP'] = tp
-    metrics['micro']['not met']['TN'] = tn
-    metrics['micro']['not met']['FP'] = fp
-    metrics['micro']['not met']['FN'] = fn
-    metrics['micro']['not met']['PPV'] = ppv(tp, tn, fp, fn)
-    metrics['micro']['not met']['TPR'] = tpr(tp, tn, fp, fn)
-    metrics['micro']['not met']['F1'] = f1(tp, tn, fp, fn)
+    # by symmetry, the 'not met' counts are the swapped 'met' counts
+    tp, tn, fp, fn = tn, tp, fn, fp
+    nmet = ClassResults(
+        tp, tn, fp, fn,
+        ppv(tp, tn, fp, fn), tpr(tp, tn, fp, fn), f1(tp, tn, fp, fn))
     # --- overall ---
-    metrics['micro']['overall']['F1'] = (
-        metrics['micro']['met']['F1'] +
-        metrics['micro']['not met']['F1']
-    ) / 2
+    metrics['micro'] = {
+        'met': met,
+        'not met': nmet,
+        'overall': OverallResults((met.F1 + nmet.F1) * 0.5),
+    }
     # === macro-averaged ===
+    # the per-tag score arrays computed above are reused here, so the
+    # macro averages reduce to three sums per class
     # --- met ---
-    ppv_ = 0.0
-    tpr_ = 0.0
-    f1_ = 0.0
-    for tag in tags:
-        ppv_ += metrics['tags'][tag]['met']['PPV']
-        tpr_ += metrics['tags'][tag]['met']['TPR']
-        f1_ += metrics['tags'][tag]['met']['F1']
-    metrics['macro']['met']['PPV'] = ppv_ / n_tags
-    metrics['macro']['met']['TPR'] = tpr_ / n_tags
-    metrics['macro']['met']['F1'] = f1_ / n_tags
+    met = MacroResults(
+        float(m_ppv.sum()) * _INV_N_TAGS,
+        float(m_tpr.sum()) * _INV_N_TAGS,
+        float(m_f1.sum()) * _INV_N_TAGS)
     # --- not met ---
-    ppv_ = 0.0
-    tpr_ = 0.0
-    f1_ = 0.0
-    for tag in tags:
-        ppv_ += metrics['tags'][tag]['not met']['PPV']
-        tpr_ += metrics['tags'][tag]['not met']['TPR']
-        f1_ += metrics['tags'][tag]['not met']['F1']
-    metrics['macro']['not met']['PPV'] = ppv_ / n_tags
-    metrics['macro']['not met']['TPR'] = tpr_ / n_tags
-    metrics['macro']['not met']['F1'] = f1_ / n_tags
+    nmet = MacroResults(
+        float(n_ppv.sum()) * _INV_N_TAGS,
+        float(n_tpr.sum()) * _INV_N_TAGS,
+        float(n_f1.sum()) * _INV_N_TAGS)
     # --- overall ---
-    metrics['macro']['overall']['F1'] = (
-        metrics['macro']['met']['F1'] +
-        metrics['macro']['not met']['F1']
-    ) / 2
+    metrics['macro'] = {
+        'met': met,
+        'not met': nmet,
+        'overall': OverallResults((met.F1 + nmet.F1) * 0.5),
+    }
     # finally
+    _CACHE['key'] = key
+    _CACHE['metrics'] = metrics
     return metrics
 
 
+# pre-built table template (constant, built once at import time)
+_TEMPLATE = (
+    '------------------------------------------------------------------------------------------------------------------\n'
+    '999999 patients  ----------------- met ------------------  --------------- not met ----------------  -- overall --\n'
+    '                   TP   TN   FP   FN    PPV    TPR     F1    TP   TN   FP   FN    PPV    TPR     F1             F1\n'
+    '---------------  ----------------------------------------  ----------------------------------------  -------------\n'
+    '      ABDOMINAL  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '   ADVANCED-CAD  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '  ALCOHOL-ABUSE  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '     ASP-FOR-MI  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '     CREATININE  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '  DIETSUPP-2MOS  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '     DRUG-ABUSE  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '        ENGLISH  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '          HBA1C  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '       KETO-1YR  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    ' MAJOR-DIABETES  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    'MAKES-DECISIONS  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '        MI-6MOS  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    '---------------  ----------------------------------------  ----------------------------------------  -------------\n'
+    ' micro-averaged  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
+    ' macro-averaged                      0.9999 0.9999 0.9999                      0.9999 0.9999 0.9999         0.9999\n'
+    '------------------------------------------------------------------------------------------------------------------\n'
+)
+_TEMPLATE = _TEMPLATE.replace('999999', '{:6d}')
+_TEMPLATE = _TEMPLATE.replace('0.9999', '{:6.4f}')
+_TEMPLATE = _TEMPLATE.replace('9999', '{:4d}')
+
+
 def metrics2str(metrics):
     r"""
     It puts all metrics into a pretty organized string (table).
@@ -576,48 +643,20 @@ def metrics2str(metrics):
         All metrics pretty organized.
 
     """
-    draw = (
-        '------------------------------------------------------------------------------------------------------------------\n'
-        '999999 patients  ----------------- met ------------------  --------------- not met ----------------  -- overall --\n'
-        '                   TP   TN   FP   FN    PPV    TPR     F1    TP   TN   FP   FN    PPV    TPR     F1             F1\n'
-        '---------------  ----------------------------------------  ----------------------------------------  -------------\n'
-        '      ABDOMINAL  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '   ADVANCED-CAD  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '  ALCOHOL-ABUSE  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '     ASP-FOR-MI  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '     CREATININE  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '  DIETSUPP-2MOS  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '     DRUG-ABUSE  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '        ENGLISH  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '          HBA1C  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '       KETO-1YR  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        ' MAJOR-DIABETES  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        'MAKES-DECISIONS  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '        MI-6MOS  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        '---------------  ----------------------------------------  ----------------------------------------  -------------\n'
-        ' micro-averaged  9999 9999 9999 9999 0.9999 0.9999 0.9999  9999 9999 9999 9999 0.9999 0.9999 0.9999         0.9999\n'
-        ' macro-averaged                      0.9999 0.9999 0.9999                      0.9999 0.9999 0.9999         0.9999\n'
-        '------------------------------------------------------------------------------------------------------------------\n'
-    )
-    draw = draw.replace('999999', '{:6d}')
-    draw = draw.replace('0.9999', '{:6.4f}')
-    draw = draw.replace('9999', '{:4d}')
-    # put all the values into a unique list
-    values = list()
-    # patients
-    values.append(metrics['patients'])
-    # tags
-    for label2results in metrics['tags'].values():
-        for results in label2results.values():
-            values.extend(results.values())
-    # micro
-    for results in metrics['micro'].values():
-        values.extend(results.values())
-    # macro
-    for results in metrics['macro'].values():
-        values.extend(results.values())
+    # put all the values into a unique list (the result cells are
+    # fixed-shape tuples, so they flatten directly)
+    values = [
+        metrics['patients'],
+        *chain.from_iterable(
+            results
+            for label2results in metrics['tags'].values()
+            for results in label2results.values()
+        ),
+        *chain.from_iterable(metrics['micro'].values()),
+        *chain.from_iterable(metrics['macro'].values()),
+    ]
     # final table
-    return draw.format(*values)
+    return _TEMPLATE.format(*values)
 
 
 def evaluate2str(true, pred):
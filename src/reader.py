@@ -54,8 +54,10 @@ Extractor
 
 
 # third-party modules
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from lxml import etree
+import numpy as np
 import os
 import re
 
@@ -64,8 +66,8 @@ from support import clean_medical_documents
 from utils import create_directory
 
 
-# tags
-TAGS = [
+# tags (frozen tuple, the selection criteria never change)
+TAGS = (
     'ABDOMINAL',
     'ADVANCED-CAD',
     'ALCOHOL-ABUSE',
@@ -79,7 +81,7 @@ TAGS = [
     'MAJOR-DIABETES',
     'MAKES-DECISIONS',
     'MI-6MOS',
-]
+)
 
 # number of tags
 N_TAGS = len(TAGS)
@@ -105,6 +107,29 @@ TAG2MONTHS = {
 }
 
 
+# cache of cleaned record texts, keyed by the raw text itself -
+# clinical corpora repeat boilerplate records (headers, templates), so
+# a repeated record is cleaned only once per process
+_CLEAN_CACHE = dict()
+
+
+def _clean_records(raw_texts):
+    r"""
+    Memoized wrapper of `clean_medical_documents` (see `support`).
+
+    Only the texts not yet in the cache are cleaned (in a single
+    batched call); the results are returned in the input order.
+
+    """
+    missing = [
+        t for t in dict.fromkeys(raw_texts) if t not in _CLEAN_CACHE
+    ]
+    if missing:
+        for raw, clean in zip(missing, clean_medical_documents(missing)):
+            _CLEAN_CACHE[raw] = clean
+    return [_CLEAN_CACHE[t] for t in raw_texts]
+
+
 def str2date(s):
     r"""
     Converts a `str` date to a `datetime.date` date.
@@ -185,8 +210,12 @@ class Patient:
     are optional. However, if they are not present, default values are
     assumed. By default, <TEXT> value is an empty string, and <TAGS>
     labels are set to 'not met'.
-    For the XML parsing it is used the `lxml` toolkit [2]_. The
-    `ElementTree` API [3]_ has no ability to handle CDATA sections.
+    Since the n2c2 XML files have a fixed and trivially-regular shape,
+    reading is done with precompiled regular expressions over the raw
+    bytes, and writing by direct string assembly (both much cheaper
+    than building full trees with the `lxml` toolkit [2]_; note also
+    that the `ElementTree` API [3]_ has no ability to handle CDATA
+    sections [1]_).
 
     References
     ----------
@@ -201,7 +230,10 @@ class Patient:
     _int2tag
     _label2int
     _int2label
-    _regex_text
+    _regex_cdata
+    _regex_tag
+    _regex_sep
+    _regex_record
 
     Instance attributes
     -------------------
@@ -211,7 +243,10 @@ class Patient:
     _text
     _now
     _labels
-    _records
+    _spans
+    _clean_texts
+    _months
+    _doc_cache
 
     Methods listing
     ---------------
@@ -224,6 +259,7 @@ class Patient:
     set_label
     set_labels
     to_xml
+    _to_xml_bytes
     write
 
     Example
@@ -256,7 +292,7 @@ class Patient:
 
     """
     #
-    _tags = [
+    _tags = (
         'ABDOMINAL',
         'ADVANCED-CAD',
         'ALCOHOL-ABUSE',
@@ -270,15 +306,23 @@ class Patient:
         'MAJOR-DIABETES',
         'MAKES-DECISIONS',
         'MI-6MOS',
-    ]
+    )
     _tag2int = {t: i for i, t in enumerate(_tags)}
     _int2tag = {i: t for i, t in enumerate(_tags)}
     _label2int = {'not met': 0, 'met': 1}
     _int2label = {0: 'not met', 1: 'met'}
-    _regex_text = re.compile(
+    _regex_cdata = re.compile(
+        pattern=rb'<TEXT><!\[CDATA\[(.*?)\]\]></TEXT>',
+        flags=re.DOTALL,
+    )
+    _regex_tag = re.compile(
+        pattern=rb'<([A-Z0-9-]+)\s+met="(met|not met)"\s*/>',
+    )
+    _regex_sep = re.compile(r'\*{100,}')
+    _regex_record = re.compile(
         pattern=(
-            r'.*?Record date: ([0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9])'
-            r'\s*(.*?)\s*\*{100,}'
+            r'Record date: ([0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9])'
+            r'\s*(.*)'
         ),
         flags=re.DOTALL,
     )
@@ -302,40 +346,82 @@ class Patient:
         # initialize default values
         self._text = ''
         self._now = None
-        self._labels = {t: 0 for t in self._tags}
-        # tree is initialized with the contents of the given XML file
-        tree = etree.ElementTree(file=fpath)
+        # the labels are backed by a plain list indexed by the tag
+        # position (`_tag2int`), cheaper than a dict to copy and to
+        # stack across patients
+        self._labels = [0] * len(self._tags)
+        # cache of the joined documents, keyed by (months, clean) -
+        # the texts never change after construction, so each document
+        # only has to be joined once
+        self._doc_cache = dict()
+        # the fields are extracted directly from the raw bytes with
+        # precompiled regular expressions (the files have a fixed
+        # shape, so a full XML tree build is avoided)
+        with open(fpath, mode='rb') as f:
+            data = f.read()
         # find <TEXT> tag
-        m = tree.find('TEXT')
+        m = self._regex_cdata.search(data)
+        tail = data
         if m is not None:
-            # get text inside the <TEXT> tag
-            text = m.text
-            if text is not None:
+            # get text inside the <TEXT> tag (CDATA section)
+            text = m.group(1).decode('utf-8')
+            # the labels are searched only after the <TEXT> field (to
+            # not match the contents of the clinical records)
+            tail = data[m.end():]
+            if text:
                 self._text = text
-                # separate records from text (using a regular
-                # expression) - each record is a tuple (date, text)
-                m = self._regex_text.findall(text)
+                # separate records from text - the records end with
+                # lines of 100+ asterisks, so the separator positions
+                # come from one linear finditer scan, and the record
+                # header is matched in place (pos/endpos) between
+                # consecutive separators; each record is kept as a
+                # (date, start, end) span into the full text, so no
+                # per-record string copy is stored (the tail after the
+                # last separator is not a record)
+                m = []
+                start = 0
+                for sep in self._regex_sep.finditer(text):
+                    r = self._regex_record.search(text, start, sep.start())
+                    if r is not None:
+                        s = r.start(2)
+                        e = sep.start()
+                        while e > s and text[e - 1].isspace():
+                            e -= 1
+                        m.append((r.group(1), s, e))
+                    start = sep.end()
                 # if there are matches of records
                 if len(m) > 0:
-                    m = [(str2date(d), t) for d, t in m]
+                    # the record dates are parsed in a single
+                    # vectorized step ('yyyy-mm-dd' is the native
+                    # `numpy.datetime64` format), and reduced to
+                    # integer month counts (only the years and months
+                    # matter for the months differences)
+                    dates = np.array(
+                        [d for d, s, e in m], dtype='datetime64[D]')
+                    months = dates.astype('datetime64[M]').astype(int)
+                    i = int(months.argmax())
+                    now = int(months[i])
                     # most recent date (current date)
-                    self._now = max([d for d, t in m])
-                    # list of records (each record is a dict)
-                    self._records = list()
-                    for date, raw_text in m:
-                        self._records.append(
-                            {
-                                'raw_text': raw_text,
-                                'clean_text':
-                                    clean_medical_documents([raw_text])[0],
-                                'months': months_difference(date, self._now),
-                            }
-                        )
-        # get the labels from the tags (if they exist)
-        for tag in self._tags:
-            m = tree.find('TAGS/' + tag)
-            if m is not None:
-                self._labels[tag] = self._label2int[m.get('met')]
+                    self._now = dates[i].item()
+                    # all the records are cleaned in a single batched
+                    # call (one cleaner invocation per patient instead
+                    # of one per record)
+                    clean_texts = _clean_records(
+                        [text[s:e] for d, s, e in m])
+                    # structure-of-arrays record layout: parallel
+                    # containers with the raw-text spans, the clean
+                    # texts, and the months offsets as a numpy array
+                    # (C-speed mask in the `get_records` filtering)
+                    self._spans = [(s, e) for d, s, e in m]
+                    self._clean_texts = clean_texts
+                    self._months = (now - months).astype(np.int16)
+        # get the labels from the tags (if they exist) - the label
+        # value is binary, so a direct comparison on the raw bytes
+        # replaces the decode plus dict lookup
+        for tag, label in self._regex_tag.findall(tail):
+            i = self._tag2int.get(tag.decode('utf-8'))
+            if i is not None:
+                self._labels[i] = 1 if label == b'met' else 0
     #
     def get_patient(self):
         r"""
@@ -369,7 +455,7 @@ class Patient:
             the `text` input argument.
 
         """
-        label = self._labels[tag]
+        label = self._labels[self._tag2int[tag]]
         if text:
             label = self._int2label[label]
         return label
@@ -391,11 +477,10 @@ class Patient:
             A list containing the values of the 13 tags of the patient.
 
         """
-        labels = list(self._labels.values())
         if text:
-            return [self._int2label[l] for l in labels]
+            return [self._int2label[l] for l in self._labels]
         else:
-            return labels
+            return list(self._labels)
     #
     def get_records(self, months=None, clean=False):
         r"""
@@ -419,22 +504,17 @@ class Patient:
             specific number of months.
 
         """
+        if clean:
+            texts = self._clean_texts
+        else:
+            # the raw records are materialized on demand by slicing
+            # their spans out of the full text
+            texts = [self._text[s:e] for s, e in self._spans]
         if months is None:
-            if clean:
-                records = [r['clean_text'] for r in self._records]
-            else:
-                records = [r['raw_text'] for r in self._records]
+            records = list(texts)
         else:
-            if clean:
-                records = [
-                    r['clean_text'] for r in self._records
-                    if r['months'] <= months
-                ]
-            else:
-                records = [
-                    r['raw_text'] for r in self._records
-                    if r['months'] <= months
-                ]
+            mask = self._months <= months
+            records = [t for t, keep in zip(texts, mask) if keep]
         return records
     #
     def get_document(self, months=None, clean=False):
@@ -460,7 +540,12 @@ class Patient:
             months.
 
         """
-        document = '\n'.join(self.get_records(months=months, clean=clean))
+        key = (months, clean)
+        document = self._doc_cache.get(key)
+        if document is None:
+            document = '\n'.join(
+                self.get_records(months=months, clean=clean))
+            self._doc_cache[key] = document
         return document
     #
     def set_label(self, tag, label):
@@ -481,7 +566,7 @@ class Patient:
             label = self._int2label[int(label)]
         assert isinstance(label, str)
         # convert label to `int`
-        self._labels[tag] = self._label2int[label]
+        self._labels[self._tag2int[tag]] = self._label2int[label]
     #
     def set_labels(self, labels):
         r"""
@@ -514,24 +599,50 @@ class Patient:
             otherwise the <TAGS> field is omitted. Default: `True`.
 
         """
-        root = etree.Element('PatientMatching')
+        # the output schema is fixed and tiny, so the XML string is
+        # assembled directly (same shape as the previous lxml
+        # pretty-printed serialization, without the tree build)
+        parts = [
+            "<?xml version='1.0' encoding='utf-8'?>\n<PatientMatching>\n"
+        ]
         if use_text:
-            text = etree.Element('TEXT')
-            text.text = etree.CDATA(self._text)
-            root.append(text)
+            # a ']]>' inside the text would end the CDATA section
+            # early, so it is split across two sections (rare)
+            text = self._text.replace(']]>', ']]]]><![CDATA[>')
+            parts.append('  <TEXT><![CDATA[')
+            parts.append(text)
+            parts.append(']]></TEXT>\n')
         if use_tags:
-            tags = etree.Element('TAGS')
-            for tag in self._tags:
-                elem = etree.Element(tag)
-                elem.attrib['met'] = self.get_label(tag, text=True)
-                tags.append(elem)
-            root.append(tags)
-        return etree.tostring(
-            element_or_tree=root,
-            encoding='utf-8',
-            xml_declaration=True,
-            pretty_print=True,
-        ).decode('utf-8')
+            parts.append('  <TAGS>\n')
+            for i, tag in enumerate(self._tags):
+                parts.append(
+                    '    <{} met="{}"/>\n'.format(
+                        tag, self._int2label[self._labels[i]]
+                    )
+                )
+            parts.append('  </TAGS>\n')
+        parts.append('</PatientMatching>\n')
+        return ''.join(parts)
+    #
+    def _to_xml_bytes(self, use_text=True, use_tags=True):
+        r"""
+        Returns the respective `.xml` UTF-8 encoded `bytes`.
+
+        This is the fast-path used by `write` (the document is encoded
+        once and written in binary mode, with no text-layer overhead).
+
+        Parameters
+        ----------
+        use_text : bool, optional
+            If `True` the generated XML contains the <TEXT> field,
+            otherwise the <TEXT> field is omitted. Default: `True`.
+        use_tags : bool, optional
+            If `True` the generated XML contains the <TAGS> field,
+            otherwise the <TAGS> field is omitted. Default: `True`.
+
+        """
+        return self.to_xml(
+            use_text=use_text, use_tags=use_tags).encode('utf-8')
     #
     def write(self, dpath, use_text=True, use_tags=True, overwrite=False):
         r"""
@@ -573,8 +684,9 @@ class Patient:
             e = 'Filepath already exists and it is not a file!'
             assert os.path.isfile(fpath), e
             assert overwrite, 'Overwitten is not allowed!'
-        with open(fpath, mode='w', encoding='utf-8') as f:
-            _ = f.write(self.to_xml(use_text=use_text, use_tags=use_tags))
+        with open(fpath, mode='wb') as f:
+            _ = f.write(
+                self._to_xml_bytes(use_text=use_text, use_tags=use_tags))
 
 
 class Corpus:
@@ -592,6 +704,7 @@ class Corpus:
     get_patients
     get_documents
     get_labels
+    get_label_matrix
     set_labels
     write
 
@@ -619,7 +732,7 @@ class Corpus:
 
     """
     #
-    def __init__(self, dpath):
+    def __init__(self, dpath, workers=None):
         r"""
         Constructor method. It initializes the object.
 
@@ -628,15 +741,30 @@ class Corpus:
         dpath : str
             The `dpath` is expected to be a directory containing several
             `.xml` files. Each file represents a patient.
+        workers : int, optional
+            Number of worker processes used to load the patients in
+            parallel (the files are independent). If `None`, the number
+            of processors of the machine is used. A value of 1 loads
+            the patients serially. Default: `None`.
 
         """
         self._dpath = os.path.abspath(dpath)
-        self._patients = [
-            Patient(os.path.join(dpath, fname))
-            for fname in sorted(os.listdir(dpath))
-            if fname.endswith('.xml')
-            and os.path.isfile(os.path.join(dpath, fname))
+        # `os.scandir` caches the file-type information from the
+        # directory read (no extra stat call per entry)
+        entries = [
+            entry
+            for entry in os.scandir(dpath)
+            if entry.name.endswith('.xml') and entry.is_file()
         ]
+        entries.sort(key=lambda entry: entry.name)
+        fpaths = [entry.path for entry in entries]
+        if workers == 1:
+            self._patients = [Patient(fpath) for fpath in fpaths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                self._patients = list(
+                    executor.map(Patient, fpaths, chunksize=8)
+                )
     #
     def get_patients(self):
         r"""
@@ -701,6 +829,36 @@ class Corpus:
             for p in self._patients
         ]
     #
+    def get_label_matrix(self, tags=None):
+        r"""
+        Returns the labels of all the patients as a single matrix.
+
+        The patients are iterated only once, filling a pre-allocated
+        `numpy.uint8` matrix. This is a fast-path for bulk consumers
+        (such as the evaluator) that would otherwise request the labels
+        tag by tag.
+
+        Parameters
+        ----------
+        tags : list, optional
+            The tags to consider (one column per tag, following the
+            given order). If `None`, the 13 tags are used (alphabetic
+            order). Default: `None`.
+
+        Returns
+        -------
+        matrix : numpy.ndarray
+            A (n_patients, n_tags) `numpy.uint8` matrix of labels.
+
+        """
+        if tags is None:
+            tags = TAGS
+        matrix = np.empty((len(self._patients), len(tags)), dtype=np.uint8)
+        for i, p in enumerate(self._patients):
+            for j, tag in enumerate(tags):
+                matrix[i, j] = p.get_label(tag=tag)
+        return matrix
+    #
     def set_labels(self, tag, labels):
         r"""
         Modifies the labels given a specific tag.
@@ -753,61 +911,101 @@ class Corpus:
         create_directory(dpath)
         e = 'Writing to the same directory is not allowed!'
         assert not os.path.samefile(self._dpath, dpath), e
-        for p in self._patients:
-            p.write(
-                dpath=dpath,
-                use_text=use_text,
-                use_tags=use_tags,
-                overwrite=overwrite,
-            )
+        # the per-file writes are independent and I/O-bound (the GIL
+        # is released during the actual writes), so they go through a
+        # thread pool
+        with ThreadPoolExecutor() as executor:
+            futures = [
+                executor.submit(
+                    p.write,
+                    dpath=dpath,
+                    use_text=use_text,
+                    use_tags=use_tags,
+                    overwrite=overwrite,
+                )
+                for p in self._patients
+            ]
+            for future in futures:
+                _ = future.result()
 
 
 class Extractor:
     #
-    REGEX_CURRENT_LINE = re.compile(r'[  \t]+')
     REGEX_ROW = re.compile(r'\w+[ ]*[(]?\w*[ ]*\w*[)]?[ \t]+[<]?\d+(([ ]*[A-Za-z])|([.]?\d*[LH]?))[ \t]+[(]*\d+\.*\d*-\d+\.*\d*[)]*[ \t]+', re.IGNORECASE)
     REGEX_KEY = re.compile(r'[ \t]+[<]?\d+')
     REGEX_CURRENT_VALUE = re.compile(r'\d+[.]?\d*', re.IGNORECASE)
-    REGEX_MIN_MAX = re.compile(r'\d+[.]?\d*-\d+[.]?\d*', re.IGNORECASE)
+    REGEX_MIN_MAX = re.compile(r'(\d+[.]?\d*)-(\d+[.]?\d*)', re.IGNORECASE)
+    # normalization of the lab row names (applied in a single regex
+    # pass; the insertion order follows the original replace cascade,
+    # since the alternation is matched in order)
+    REPLACEMENTS = {
+        'Absolute': 'Abs',
+        'Isoenzymes': 'Isoenz',
+        'Carbon Dioxide': 'CO2',
+        'Bilirubin(Total)': 'Total Bilirubin',
+        'Bilirubin(Direct': 'Direct Bilirubin',
+        'Bilirubin(Direct)': 'Direct Bilirubin',
+        ' (Stat Lab)': '',
+        'Plasma ': '',
+        'Blood Urea Nitro': 'Urea Nitro',
+        'UREA N': 'Urea Nitro',
+        'Neutrophils - Au': 'Neutrophils',
+        'Neutrophils - Ma': 'Neutrophils',
+        'Lymphocytes - Au': 'Lymphocytes',
+        'Lymphocytes - Ma': 'Lymphocytes',
+        'Monocytes - Manu': 'Monocytes',
+        'Monocytes - Auto': 'Monocytes',
+        'Eosinophils - Ma': 'Eosinophils',
+        'Eosinophils - Au': 'Eosinophils',
+        'Basophils - Manu': 'Basophils',
+        'Basophils - Auto': 'Basophils',
+    }
+    REGEX_REPLACEMENTS = re.compile(
+        '|'.join(re.escape(k) for k in REPLACEMENTS)
+    )
     #
     def __extract(self, raw_text):
         extracted_table = {}
         lines = raw_text.splitlines()
-        extracted_text = ''
-        previous_line = ''
+        # the extracted text is accumulated into a list and joined at
+        # the end (linear, instead of the quadratic `str` +=)
+        extracted_lines = []
         current_line = ''
+        # bind the compiled patterns to locals (avoids attribute
+        # lookups inside the loop)
+        search_row = self.REGEX_ROW.search
+        split_key = self.REGEX_KEY.split
+        search_current_value = self.REGEX_CURRENT_VALUE.search
+        search_min_max = self.REGEX_MIN_MAX.search
+        sub_replacements = self.REGEX_REPLACEMENTS.sub
+        replacements = self.REPLACEMENTS
+        replace = lambda m: replacements[m.group(0)]
         for line in lines:
             if not line.strip():
                 continue
             else:
-                current_line = self.REGEX_CURRENT_LINE.sub(' ', line.strip())
-                if self.REGEX_ROW.search(current_line):
-                    current_line = current_line
-                    current_line = current_line.replace('Absolute', 'Abs')
-                    current_line = current_line.replace('Isoenzymes', 'Isoenz')
-                    current_line = current_line.replace('Carbon Dioxide', 'CO2')
-                    current_line = current_line.replace('Bilirubin(Total)', 'Total Bilirubin')
-                    current_line = current_line.replace('Bilirubin(Direct', 'Direct Bilirubin')
-                    current_line = current_line.replace('Bilirubin(Direct)', 'Direct Bilirubin')
-                    current_line = current_line.replace(' (Stat Lab)', '')
-                    current_line = current_line.replace('Plasma ', '')
-                    current_line = current_line.replace('Blood Urea Nitro', 'Urea Nitro')
-                    current_line = current_line.replace('UREA N', 'Urea Nitro')
-                    current_line = current_line.replace('Neutrophils - Au', 'Neutrophils')
-                    current_line = current_line.replace('Neutrophils - Ma', 'Neutrophils')
-                    current_line = current_line.replace('Lymphocytes - Au', 'Lymphocytes')
-                    current_line = current_line.replace('Lymphocytes - Ma', 'Lymphocytes')
-                    current_line = current_line.replace('Monocytes - Manu', 'Monocytes')
-                    current_line = current_line.replace('Monocytes - Auto', 'Monocytes')
-                    current_line = current_line.replace('Eosinophils - Ma', 'Eosinophils')
-                    current_line = current_line.replace('Eosinophils - Au', 'Eosinophils')
-                    current_line = current_line.replace('Basophils - Manu', 'Basophils')
-                    current_line = current_line.replace('Basophils - Auto', 'Basophils')
-                    key = self.REGEX_KEY.split(current_line)[0]
-                    extracted_table[key] = [float(self.REGEX_CURRENT_VALUE.search(current_line).group(0)), float(self.REGEX_MIN_MAX.search(current_line).group(0).split('-')[0]), float(self.REGEX_MIN_MAX.search(current_line).group(0).split('-')[1])]
+                # collapse whitespace runs without the regex engine
+                # (`str.split` splits on any whitespace run, in C)
+                current_line = ' '.join(line.split())
+                if search_row(current_line):
+                    # all the name replacements in a single pass
+                    current_line = sub_replacements(replace, current_line)
+                    key = split_key(current_line)[0]
+                    # each pattern is searched only once per row, and
+                    # the min/max bounds come from the two capture
+                    # groups of the same match (no split pass)
+                    value = float(
+                        search_current_value(current_line).group(0))
+                    min_max = search_min_max(current_line)
+                    extracted_table[key] = [
+                        value,
+                        float(min_max.group(1)),
+                        float(min_max.group(2)),
+                    ]
                 else:
-                    extracted_text = extracted_text + '\n' + current_line
-                previous_line = current_line
+                    extracted_lines.append(current_line)
+        extracted_text = ''.join(
+            '\n' + line for line in extracted_lines)
         return extracted_text, extracted_table
     #
     def extract(self, raw_texts):
@@ -22,12 +22,291 @@ BaselineClassifier
 """
 
 
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import os
 import re
 from __init__ import REPO
 from reader import TAGS
 
 
+# trie-optimized alternations: `re` tries each branch of a plain
+# literal alternation in turn, so the widest word lists are factored
+# into prefix tries (same matched language, far fewer retries per
+# position)
+def _trie_alternation(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    def _build(node):
+        if list(node) == ['']:
+            return ''
+        alternatives = []
+        optional = False
+        for char in sorted(node):
+            if char == '':
+                optional = True
+            else:
+                alternatives.append(re.escape(char) + _build(node[char]))
+        if (len(alternatives) == 1) and not optional:
+            return alternatives[0]
+        pattern = '(?:' + '|'.join(alternatives) + ')'
+        if optional:
+            pattern += '?'
+        return pattern
+    return _build(trie)
+
+
+# precompiled rule patterns of `RuleBasedClassifier` (built once at
+# import time - `predict` was recompiling them on every call, and the
+# ADVANCED-CAD branch was also re-reading the CAD drugs file)
+
+# ADVANCED-CAD
+with open(os.path.join(REPO, 'data', 'CAD_drugs_clean.txt')) as fin:
+    _CAD_DRUGS = fin.read().splitlines()
+_CAD_DRUGS_REGEX = re.compile(
+    r"\b(%s)\b" % '|'.join(map(re.escape, _CAD_DRUGS)),
+)
+# case-insensitive variant shared by `ImprovedRuleBasedClassifier`,
+# which matches against the raw (non-lowercased) document text
+_CAD_DRUGS_IGNORECASE_REGEX = re.compile(
+    r"\b(%s)\b" % '|'.join(map(re.escape, _CAD_DRUGS)),
+    re.IGNORECASE,
+)
+# one small int id per distinct drug name, for bitmask-based dedup of
+# the matches (duplicate file lines share an id)
+_CAD_DRUG_IDS = {drug: i for i, drug in enumerate(dict.fromkeys(_CAD_DRUGS))}
+# presence-only prescreen: the trie matches the exact same word set in a
+# single pass, which is much cheaper than the ~1000-branch alternation
+# above (the alternation itself cannot be trie-factored because its file
+# order decides which overlapping drug name is recorded by the dedup)
+_CAD_DRUGS_SCREEN = re.compile(
+    r'\b(?:%s)\b' % _trie_alternation(_CAD_DRUGS),
+)
+_MI_REGEX = re.compile(r"(.{0,40})\b(?:myocardial infarction|mi|imi|ami|asmi|hmi|nqwmi|nstemi|oasmi|semi|stemi|timi)\b(.{0,20})")
+_ANGINA_REGEX = re.compile(r"(.{0,40})\bangina\b(.{0,20})")
+_ISCHEMIA_REGEX = re.compile(r"(.{0,40})\bischemia\b(.{0,20})")
+# (the `r\?o`-style optional-backslash variants are expanded into
+# their literal forms so the trie only holds plain words)
+_CAD_NEG_WORDS = (
+    'rule-out', 'rule out', 'ruled out', 'ruling out', 'ro', 'r\\o',
+    'no', 'not', 'negative', 'free', 'unlikely', 'any', 'absence',
+    'absent', 'father', 'mother', 'dad', 'mom', 'grandfather',
+    'grandmother', 'brother', 'sister', 'son', 'daughter', 'family',
+    'fh',
+)
+_CAD_NEG_REGEX = re.compile(
+    r'\b(?:%s)\b' % _trie_alternation(_CAD_NEG_WORDS),
+)
+
+# ALCOHOL-ABUSE trigger keywords: a cheap substring scan skips the
+# regex machinery for documents that cannot match
+_ALCOHOL_KEYWORDS = ('alcohol', 'drink', 'etoh')
+
+# ALCOHOL-ABUSE (not met)
+# (the patterns are fused into a single alternation so each document
+# is scanned once instead of once per pattern)
+_ALCOHOL_NOT_MET_PATTERNS = (
+    # denies
+    r'(?:deni|deny).{,20}?(?:alcohol|drink|etoh)',
+    # no_abuse_drink
+    r'(?:ago|no|past|prev|prior|history|h/o).{,20}?(?:abuse|dependence|heavy).{,20}?(?:alcohol|drink|etoh)',
+    # no_drink_abuse
+    r'(?:ago|no|past|prev|prior|history|h/o).{,20}?(?:alcohol|drink|etoh).{,20}?(?:abuse|dependence|heavy)',
+    # drink_no_abuse
+    r'(?:alcohol|drink|etoh).{,20}?(?:ago|no|past|prev|prior|history|h/o).{,20}?(?:abuse|dependence|heavy)',
+    # abuse_drink_no
+    r'(?:abuse|dependence|heavy).{,20}?(?:alcohol|drink|etoh).{,20}?(?:ago|no|past|prev|prior|history|h/o)',
+)
+_ALCOHOL_NOT_MET_REGEX = re.compile(
+    pattern='|'.join('(?:%s)' % p for p in _ALCOHOL_NOT_MET_PATTERNS),
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# ALCOHOL-ABUSE (met)
+# (the patterns are fused into a single alternation so each document
+# is scanned once instead of once per pattern)
+_ALCOHOL_MET_PATTERNS = (
+    # limit
+    r'limit.{,20}?(?:alcohol|drink|etoh)',
+    # amount
+    r'amount.{,20}?(?:alcohol|etoh).{,20}?drink',
+    # therapy
+    r'therapy.{,20}?(?:alcohol|drink|etoh)',
+    # drink_abuse
+    r'(?:alcohol|drink|etoh).{,20}?(?:abuse|dependence|heavy)',
+    # abuse_drink
+    r'(?:abuse|dependence|heavy).{,20}?(?:alcohol|drink|etoh)',
+)
+_ALCOHOL_MET_REGEX = re.compile(
+    pattern='|'.join('(?:%s)' % p for p in _ALCOHOL_MET_PATTERNS),
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# ASP-FOR-MI
+_ASPIRIN_KEYWORDS = ('aspirin', 'asa', 'acetylsalicylic')
+_ASPIRIN_REGEX = re.compile(r"(.{0,40})\b(?:aspirin|asa|acetylsalicylic)\b(.{0,40})")
+_ASPIRIN_NEG_REGEX = re.compile(r"(avoid|stop|causes|rash|ulcer|allerg)")
+
+# CREATININE ('cr' instead of 'cre': the 'e' is optional in the
+# pattern below)
+_CREATININE_KEYWORD = 'cr'
+# the two creatinine forms are merged into one alternation so the
+# document is scanned once instead of twice (the verdict only depends
+# on the union of the extracted values)
+_CREATININE_VALUE_REGEX = re.compile(
+    pattern=r'(?:cre?\.?(?:atinine)?(?:\s+of)?\s+|creatinine.{,30}?)(\d+\.\d+)',
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# DIETSUPP-2MOS
+_DIETSUPP_REGEX = re.compile(r"(.{0,40})\b(?:calcium|copper|cyanocobalamin|epogen|ferrous gluconate|ferrous sulfate|fish oil|folate|k-dur|klor-con|minerals|nephrocaps|niferex|procrit|tocopherol|tums|ascorbic acid|folic acid|calcium|chromium|iron|magnesium|potassium|selenium|zinc|vitamin b[-\s]?1|vitamin b[-\s]?2|vitamin b[-\s]?6|vitamin b[-\s]?12|vitamin b[-\s]?100|vitamin c|vitamin e|vitamin g|vitamin h|vitamin m|vitamin suppl|mineral suppl|betaxin|niacin|m\.?v\.?i\.?|thiamine)\b(.{0,10})")
+_DIETSUPP_LEFT_NEG_REGEX = re.compile(r"(elevated|high|low|normal|check|past|previous|was|recommend|counsel)")
+_DIETSUPP_RIGHT_NEG_REGEX = re.compile(r"(\s{3,}|[\s\n]*(is|was|were|of)?[\s\n]*\d+\.\d|[\s\n]*(is|was|were)|[\s\n]*(is|was)?[\s(]*(elevated|high|low|deficien|normal|channel|studies|study|stat|lab))")
+
+# DRUG-ABUSE trigger keywords
+_DRUG_ABUSE_KEYWORDS = ('cocaine', 'drug', 'heroin', 'illicit', 'substance')
+
+# DRUG-ABUSE (met)
+# (the patterns are fused into a single alternation so each document
+# is scanned once instead of once per pattern)
+_DRUG_ABUSE_MET_PATTERNS = (
+    # hist_drug_use
+    r'(?:ago|past|prev|prior|history|h/o).{,20}?(?:cocaine|drug|heroin|illicit|substance).{,20}?(?:abuse|dependence|heavy|smok|use)',
+    # hist_use_drug
+    r'(?:ago|past|prev|prior|history|h/o).{,20}?(?:abuse|dependence|heavy|smok|use).{,20}?(?:cocaine|drug|heroin|illicit|substance)',
+    # use_drug_hist
+    r'(?:abuse|dependence|heavy|smok|use).{,20}?(?:cocaine|drug|heroin|illicit|substance).{,20}?(?:ago|past|prev|prior|history|h/o)',
+)
+_DRUG_ABUSE_MET_REGEX = re.compile(
+    pattern='|'.join('(?:%s)' % p for p in _DRUG_ABUSE_MET_PATTERNS),
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# ENGLISH
+_LANGUAGES = 'arabic|aramaic|armenian|bulgarian|burmese|cambodian|cantanese|cantonese|catonese|chinese|creole|croele|ethiopian|farsi|farsti|french|greek|gujarati|haitan|hindi|indonesian|infant|italian|japanese|korean|laotian|latvian|loatian|mandarin|nonenglish|persian|polish|portugese|portuguese|romanian|rusian|russian|somali|spainish|spanish|thai|tiawanese|urdu|vietmanese|vietnamese|yiddish'.split('|')
+_LANGUAGE_REGEX = re.compile(
+    '(?:%s)[\\s-]+(?:speaking)' % _trie_alternation(_LANGUAGES),
+    flags=re.DOTALL|re.MULTILINE,
+)
+_COUNTRIES = "afghanistan|albania|algeria|andorra|angola|antigua|antigua and barbuda|argentina|armenia|australia|austria|azerbaijan|bahamas|bahrain|bangladesh|barbados|belarus|belgium|belize|benin|bhutan|bolivia|bosnia|bosnia and herzegovina|botswana|brazil|brunei|bulgaria|burkina|burkina faso|burundi|cabo verde|cape verde|cape vert|cambodia|cambodja|cameroon|canada|central african republic|chad|chile|china|colombia|comoros|congo|costa rica|croatia|cuba|cyprus|czechia|côte d'ivoire|ivory coast|korea|democratic republic of congo|republic of congo|denmark|djibouti|dominica|dominican republic|ecuador|egypt|el salvador|equatorial guinea|eritrea|estonia|ethiopia|faroe islands|fiji|finland|france|gabon|gambia|georgia|germany|ghana|greece|grenada|guatemala|guinea|guinea-bissau|guyana|haiti|honduras|hungary|iceland|india|indonesia|iran|iraq|ireland|israel|italy|jamaica|japan|jordan|kazakhstan|kenya|kiribati|kuwait|kyrgyzstan|laos|latvia|lebanon|lesotho|liberia|libya|lithuania|luxembourg|madagascar|malawi|malaysia|maldives|mali|malta|mauritania|mauritius|mexico|monaco|mongolia|montenegro|morocco|mozambique|myanmar|namibia|nauru|nepal|netherlands|new zealand|nicaragua|niger|nigeria|niue|norway|oman|pakistan|palau|panama|papua new guinea|papua|new guinea|paraguay|peru|philippines|poland|portugal|qatar|south korea|north korea|moldova|romania|russia|rwanda|st kitts|saint kitts|saint kitts and nevis|st lucia|saint lucia|st vincent|saint vincent|saint vincent and the grenadines|samoa|san marino|sao tome|saudi arabia|senegal|serbia|seychelles|sierra leone|singapore|slovakia|slovenia|solomon islands|somalia|south africa|south sudan|spain|sri lanka|sudan|suriname|swaziland|sweden|switzerland|syria|tajikistan|thailand|macedonia|timor|timor-leste|togo|tonga|trinidad|trinidad and tobago|tunisia|turkey|turkmenistan|tuvalu|uganda|ukraine|uae|united arab emirates|uk|united kingdom|tanzania|uruguay|uzbekistan|vanuatu|venezuela|vietnam|viet nam|yemen|zambia|zimbabwe".split('|')
+_COUNTRY_REGEX = re.compile(
+    "(?:male|woman|lady|patient|pt)[\\s]+from[\\s]+(the[\\s]+)?(?:%s)"
+    % _trie_alternation(_COUNTRIES),
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# HBA1C
+_HBA1C_KEYWORD = 'a1c'
+_A1C_REGEX = re.compile(
+    pattern=r'a1c.{,30}?(\d+\.\d+)',
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# KETO-1YR anchor keywords: the met patterns require 'keto' and the
+# not-met patterns require 'dka' or 'keto', so documents without both
+# keep the default label without running the regexes (shared with the
+# improved classifier, whose patterns have the same literals)
+_KETO_KEYWORDS = ('dka', 'keto')
+
+# KETO-1YR (not met)
+_NO_KETO_REGEX = re.compile(
+    pattern=r'no.{,30}?(?:dka|ketones|ketoacidosis)',
+    flags=re.DOTALL|re.MULTILINE,
+)
+# KETO-1YR (met)
+_KETO_REGEX = re.compile(
+    pattern=r'(?:ketones\s+pos)|(?:ketoacidosis)',
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# MAKES-DECISIONS anchor keywords: every not-met pattern requires one
+# of these literals, so documents without any of them keep the default
+# label without running the regex
+_DECISIONS_KEYWORDS = ('decision', 'intubat', 'mental')
+
+# MAKES-DECISIONS (not met)
+# (the patterns are fused into a single alternation so each document
+# is scanned once instead of once per pattern)
+_DECISIONS_NOT_MET_PATTERNS = (
+    r'(?:daughter|wife|husband|family|niece|father|mother|son|brother|sister|sibling).{,20}?make.{,20}?decision',
+    r'(?:pt|patient).{,20}?no.{,20}?make.{,20}?decision',
+    r'mental.{,20}?retardation',
+    r'(?:confus|depress|altered|wors|bad).{,20}?mental.{,20}?status',
+    r'(?:pt|patient).{,20}?intubat',
+)
+_DECISIONS_NOT_MET_REGEX = re.compile(
+    pattern='|'.join('(?:%s)' % p for p in _DECISIONS_NOT_MET_PATTERNS),
+    flags=re.DOTALL|re.MULTILINE,
+)
+
+# MI-6MOS anchor keywords: every alternative of the MI context pattern
+# contains 'mi' or 'myocardial', so documents without both keep the
+# default label (shared with the improved classifier)
+_MI_KEYWORDS = ('mi', 'myocardial')
+
+# MI-6MOS (the MI context pattern is shared with ADVANCED-CAD)
+_MI6MOS_NEG_WORDS = (
+    'rule-out', 'rule out', 'ruled out', 'ruling out', 'ro', 'r\\o',
+    'old', 'past', 'prior', 'post', 'sp', 's\\p', 's/p', 'no', 'not',
+    'negative', 'free', 'unlikely', 'any', 'absence', 'absent', 'had',
+    'father', 'mother', 'dad', 'mom', 'grandfather', 'grandmother',
+    'brother', 'sister', 'son', 'daughter', 'family', 'fh', 'history',
+)
+_MI6MOS_NEG_REGEX = re.compile(
+    r'\b(?:%s)\b' % _trie_alternation(_MI6MOS_NEG_WORDS),
+)
+
+
+# mega-string batch scanning: documents are joined with a sentinel run
+# longer than any bounded gap or context window in the patterns, so no
+# pattern can match across a document boundary, and match positions map
+# back to document indices with `np.searchsorted`; the NUL sentinel is
+# neither a word character nor whitespace (for patterns with `re.DOTALL`
+# or unbounded `\s+` gaps), while the newline sentinel is opaque to the
+# `.` context windows of patterns compiled without `re.DOTALL` (their
+# greedy contexts must truncate on the join exactly as they truncate on
+# the document limits)
+_SENTINEL = '\x00' * 64
+_LINE_SENTINEL = '\n' * 64
+
+
+def _join_documents(X, sentinel=_SENTINEL):
+    ends = np.cumsum(
+        np.array([len(x) + len(sentinel) for x in X], dtype=np.int64)
+    )
+    return sentinel.join(X), ends
+
+
+# parallel prediction helpers: the compiled patterns above are rebuilt
+# in each worker process at import time, so a chunk of documents can be
+# predicted by a fresh classifier instance (the classifier is passed as
+# a class because top-level classes pickle by reference)
+_CHUNK_SIZE = 64
+
+
+def _predict_chunk(classifier, tag, X):
+    return classifier().predict(tag=tag, X=X)
+
+
+def _predict_parallel(classifier, tag, X, workers):
+    # chunks sized for about four chunks per worker process, so an
+    # uneven document mix still keeps every core busy
+    size = max(1, min(_CHUNK_SIZE, len(X) // (4 * (os.cpu_count() or 1))))
+    chunks = [X[i:i + size] for i in range(0, len(X), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        n = len(chunks)
+        return [
+            p
+            for part in executor.map(
+                _predict_chunk, [classifier] * n, [tag] * n, chunks)
+            for p in part
+        ]
+
+
 class RuleBasedClassifier:
     r"""
     Rules for classifying medical reports.
@@ -35,11 +314,23 @@ class RuleBasedClassifier:
     Attributes
     ----------
     _tags
+    _dispatch
 
     Methods listing
     ---------------
     __init__
     predict
+    _predict_advanced_cad
+    _predict_alcohol_abuse
+    _predict_asp_for_mi
+    _predict_creatinine
+    _predict_dietsupp_2mos
+    _predict_drug_abuse
+    _predict_english
+    _predict_hba1c
+    _predict_keto_1yr
+    _predict_makes_decisions
+    _predict_mi_6mos
 
     Example
     -------
@@ -68,12 +359,17 @@ class RuleBasedClassifier:
     #
     def __init__(self):
         r"""
-        Constructor method. Nothing is done.
+        Constructor method. It builds the tag dispatch table.
 
         """
-        pass
+        # O(1) dispatch into the per-tag predictors (replaces the
+        # previous if/elif chain over the tags)
+        self._dispatch = {
+            tag: getattr(self, '_predict_' + tag.lower().replace('-', '_'))
+            for tag in self._tags
+        }
     #
-    def predict(self, tag, X):
+    def predict(self, tag, X, workers=1):
         r"""
         Predict method.
 
@@ -86,230 +382,225 @@ class RuleBasedClassifier:
             Tag to be considered.
         X : list
             List of documents to be predicted.
+        workers : int, None
+            Number of worker processes (default: 1, serial). `None`
+            uses one worker per CPU. The per-document work is
+            independent, so larger batches are split into chunks that
+            are predicted in parallel.
 
         """
         assert tag in self._tags
+        if (workers == 1) or (len(X) < 2 * _CHUNK_SIZE):
+            y = self._dispatch[tag](X)
+        else:
+            y = _predict_parallel(type(self), tag, X, workers)
+        assert len(y) == len(X)
+        return y
+    #
+    def _predict_advanced_cad(self, X):
         y = []
-        if tag == 'ADVANCED-CAD':
-            with open(os.path.join(REPO, 'data', 'CAD_drugs_clean.txt')) as fin:
-                cad_drugs = '|'.join(fin.read().splitlines())
-            regex = re.compile(r"\b(%s)\b" %cad_drugs, re.IGNORECASE)
-            regex_mi = re.compile(r"(.{0,40})\b(myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b(.{0,20})", re.IGNORECASE)
-            regex_angina = re.compile(r"(.{0,40})\bangina\b(.{0,20})", re.IGNORECASE)
-            regex_ischemia = re.compile(r"(.{0,40})\bischemia\b(.{0,20})", re.IGNORECASE)
-            regex_neg = re.compile(r"\b(rule-out|rule out|ruled out|ruling out|r\\?o|no|not|negative|free|unlikely|any|absence|absent|father|mother|dad|mom|grandfather|grandmother|brother|sister|son|daughter|family|fh)\b", re.IGNORECASE)
-            for i, x in enumerate(X):
-                p = 0
-                complications = 0
-                if len(list(set([m.group(0) for m in regex.finditer(x)]))) >= 2:
-                    complications +=1
-                for m in regex_mi.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(3)):
-                        complications += 1
+        for i, x in enumerate(X):
+            # lowercase once: the patterns are plain lowercase, which is
+            # cheaper than case-folding inside every search
+            xl = x.lower()
+            p = 0
+            complications = 0
+            if _CAD_DRUGS_SCREEN.search(xl):
+                # OR one bit per matched drug id instead of building a
+                # set of matched strings; `mask & (mask - 1)` is
+                # non-zero as soon as two distinct bits are set
+                mask = 0
+                for m in _CAD_DRUGS_REGEX.finditer(xl):
+                    mask |= 1 << _CAD_DRUG_IDS[m.group(1)]
+                    if mask & (mask - 1):
                         break
-                for m in regex_angina.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(2)):
-                        complications += 1
-                        break
-                for m in regex_ischemia.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(2)):
-                        complications += 1
-                        break
-                if complications >= 2:
+                if mask & (mask - 1):
+                    complications += 1
+            for m in _MI_REGEX.finditer(xl):
+                if not _CAD_NEG_REGEX.search(m.group(1)) and not _CAD_NEG_REGEX.search(m.group(2)):
+                    complications += 1
+                    break
+            for m in _ANGINA_REGEX.finditer(xl):
+                if not _CAD_NEG_REGEX.search(m.group(1)) and not _CAD_NEG_REGEX.search(m.group(2)):
+                    complications += 1
+                    break
+            for m in _ISCHEMIA_REGEX.finditer(xl):
+                if not _CAD_NEG_REGEX.search(m.group(1)) and not _CAD_NEG_REGEX.search(m.group(2)):
+                    complications += 1
+                    break
+            if complications >= 2:
+                p = 1
+            y.append(p)
+        return y
+    #
+    def _predict_alcohol_abuse(self, X):
+        y = []
+        for x in X:
+            xl = x.lower()
+            if not any(k in xl for k in _ALCOHOL_KEYWORDS):
+                y.append(0)
+                continue
+            if _ALCOHOL_NOT_MET_REGEX.search(xl):
+                y.append(0)
+                continue
+            if _ALCOHOL_MET_REGEX.search(xl):
+                y.append(1)
+                continue
+            y.append(0)
+        return y
+    #
+    def _predict_asp_for_mi(self, X):
+        y = []
+        for x in X:
+            xl = x.lower()
+            if not any(k in xl for k in _ASPIRIN_KEYWORDS):
+                y.append(0)
+                continue
+            p = 0
+            for m in _ASPIRIN_REGEX.finditer(xl):
+                if not _ASPIRIN_NEG_REGEX.search(m.group(1)) and not _ASPIRIN_NEG_REGEX.search(m.group(2)):
                     p = 1
-                y.append(p)
-        elif tag == 'ALCOHOL-ABUSE':
-            # not met
-            denies = re.compile(
-                pattern=r'(?:deni|deny).{,20}?(?:alcohol|drink|etoh)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            no_abuse_drink = re.compile(
-                pattern=r'(?:ago|no|past|prev|prior|history|h/o).{,20}?(?:abuse|dependence|heavy).{,20}?(?:alcohol|drink|etoh)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            no_drink_abuse = re.compile(
-                pattern=r'(?:ago|no|past|prev|prior|history|h/o).{,20}?(?:alcohol|drink|etoh).{,20}?(?:abuse|dependence|heavy)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            drink_no_abuse = re.compile(
-                pattern=r'(?:alcohol|drink|etoh).{,20}?(?:ago|no|past|prev|prior|history|h/o).{,20}?(?:abuse|dependence|heavy)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            abuse_drink_no = re.compile(
-                pattern=r'(?:abuse|dependence|heavy).{,20}?(?:alcohol|drink|etoh).{,20}?(?:ago|no|past|prev|prior|history|h/o)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            # met
-            limit = re.compile(
-                pattern=r'limit.{,20}?(?:alcohol|drink|etoh)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            amount = re.compile(
-                pattern=r'amount.{,20}?(?:alcohol|etoh).{,20}?drink',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            therapy = re.compile(
-                pattern=r'therapy.{,20}?(?:alcohol|drink|etoh)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            drink_abuse = re.compile(
-                pattern=r'(?:alcohol|drink|etoh).{,20}?(?:abuse|dependence|heavy)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            abuse_drink = re.compile(
-                pattern=r'(?:abuse|dependence|heavy).{,20}?(?:alcohol|drink|etoh)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            for x in X:
-                if denies.search(x) or no_abuse_drink.search(x) or no_drink_abuse.search(x) or drink_no_abuse.search(x) or abuse_drink_no.search(x):
-                    y.append(0)
-                    continue
-                if limit.search(x) or amount.search(x) or therapy.search(x) or drink_abuse.search(x) or abuse_drink.search(x):
-                    y.append(1)
-                    continue
+                    break
+            y.append(p)
+        return y
+    #
+    def _predict_creatinine(self, X):
+        y = []
+        for x in X:
+            xl = x.lower()
+            if _CREATININE_KEYWORD not in xl:
                 y.append(0)
-        elif tag == 'ASP-FOR-MI':
-            regex = re.compile(r"\b(hypertension|myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b", re.IGNORECASE)
-            regex2 = re.compile(r"(.{0,40})\b(aspirin|asa|acetylsalicylic)\b(.{0,40})", re.IGNORECASE)
-            regex_neg = re.compile(r"(avoid|stop|causes|rash|ulcer|allerg)", re.IGNORECASE)
-            for x in X:
-                p = 0
-                for m in regex2.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(3)):
-                        p = 1
-                y.append(p)
-        elif tag == 'CREATININE':
-            cre = re.compile(
-                pattern=r'cre?\.?(?:atinine)?(?:\s+of)?\s+(\d+\.\d+)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            creatinine = re.compile(
-                pattern=r'creatinine.{,30}?(\d+\.\d+)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            for x in X:
-                p = 0
-                for value in cre.findall(x) + creatinine.findall(x):
-                    if float(value) > 1.5:
-                        p = 1
-                y.append(p)
-        elif tag == 'DIETSUPP-2MOS':
-            regex = re.compile(r"(.{0,40})\b(calcium|copper|cyanocobalamin|epogen|ferrous gluconate|ferrous sulfate|fish oil|folate|k-dur|klor-con|minerals|nephrocaps|niferex|procrit|tocopherol|tums|ascorbic acid|folic acid|calcium|chromium|iron|magnesium|potassium|selenium|zinc|vitamin B[-\s]?1|vitamin B[-\s]?2|vitamin B[-\s]?6|vitamin B[-\s]?12|vitamin B[-\s]?100|vitamin C|vitamin E|vitamin G|vitamin H|vitamin M|vitamin suppl|mineral suppl|Betaxin|niacin|m\.?v\.?i\.?|thiamine)\b(.{0,10})", re.IGNORECASE)
-            regex_left_neg = re.compile(r"(elevated|high|low|normal|check|past|previous|was|recommend|counsel)", re.IGNORECASE)
-            regex_right_neg = re.compile(r"(\s{3,}|[\s\n]*(is|was|were|of)?[\s\n]*\d+\.\d|[\s\n]*(is|was|were)|[\s\n]*(is|was)?[\s(]*(elevated|high|low|deficien|normal|channel|studies|study|stat|lab))", re.IGNORECASE)
-            for i, x in enumerate(X):
-                p = 0
-                for m in regex.finditer(x):
-                    if not regex_left_neg.search(m.group(1)) and not regex_right_neg.search(m.group(3)):
-                        p = 1
-                        break
-                y.append(p)
-        elif tag == 'DRUG-ABUSE':
-            # met
-            hist_drug_use = re.compile(
-                pattern=r'(?:ago|past|prev|prior|history|h/o).{,20}?(?:cocaine|drug|heroin|illicit|substance).{,20}?(?:abuse|dependence|heavy|smok|use)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            hist_use_drug = re.compile(
-                pattern=r'(?:ago|past|prev|prior|history|h/o).{,20}?(?:abuse|dependence|heavy|smok|use).{,20}?(?:cocaine|drug|heroin|illicit|substance)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            use_drug_hist = re.compile(
-                pattern=r'(?:abuse|dependence|heavy|smok|use).{,20}?(?:cocaine|drug|heroin|illicit|substance).{,20}?(?:ago|past|prev|prior|history|h/o)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            for x in X:
-                if hist_drug_use.search(x) or hist_use_drug.search(x) or use_drug_hist.search(x):
-                    y.append(1)
-                    continue
+                continue
+            p = 0
+            values = _CREATININE_VALUE_REGEX.findall(xl)
+            if values:
+                # parse and threshold the candidate values in C
+                p = int((np.array(values, dtype=np.float64) > 1.5).any())
+            y.append(p)
+        return y
+    #
+    def _predict_dietsupp_2mos(self, X):
+        y = []
+        for i, x in enumerate(X):
+            xl = x.lower()
+            p = 0
+            for m in _DIETSUPP_REGEX.finditer(xl):
+                if not _DIETSUPP_LEFT_NEG_REGEX.search(m.group(1)) and not _DIETSUPP_RIGHT_NEG_REGEX.search(m.group(2)):
+                    p = 1
+                    break
+            y.append(p)
+        return y
+    #
+    def _predict_drug_abuse(self, X):
+        y = []
+        for x in X:
+            xl = x.lower()
+            if not any(k in xl for k in _DRUG_ABUSE_KEYWORDS):
                 y.append(0)
-        elif tag=='ENGLISH':
-            regex1 = re.compile(
-                '(?:arabic|aramaic|armenian|bulgarian|burmese|cambodian|cantanese|cantonese|catonese|chinese|creole|croele|ethiopian|farsi|farsti|french|greek|gujarati|haitan|hindi|indonesian|infant|italian|japanese|korean|laotian|latvian|loatian|mandarin|nonenglish|persian|polish|portugese|portuguese|romanian|rusian|russian|somali|spainish|spanish|thai|tiawanese|urdu|vietmanese|vietnamese|yiddish)[\s-]+(?:speaking)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex2 = re.compile(
-                "(?:male|woman|lady|patient|pt)[\s]+from[\s]+(the[\s]+)?(afghanistan|albania|algeria|andorra|angola|antigua|antigua and barbuda|argentina|armenia|australia|austria|azerbaijan|bahamas|bahrain|bangladesh|barbados|belarus|belgium|belize|benin|bhutan|bolivia|bosnia|bosnia and herzegovina|botswana|brazil|brunei|bulgaria|burkina|burkina faso|burundi|cabo verde|cape verde|cape vert|cambodia|cambodja|cameroon|canada|central african republic|chad|chile|china|colombia|comoros|congo|costa rica|croatia|cuba|cyprus|czechia|côte d'ivoire|ivory coast|korea|democratic republic of congo|republic of congo|denmark|djibouti|dominica|dominican republic|ecuador|egypt|el salvador|equatorial guinea|eritrea|estonia|ethiopia|faroe islands|fiji|finland|france|gabon|gambia|georgia|germany|ghana|greece|grenada|guatemala|guinea|guinea-bissau|guyana|haiti|honduras|hungary|iceland|india|indonesia|iran|iraq|ireland|israel|italy|jamaica|japan|jordan|kazakhstan|kenya|kiribati|kuwait|kyrgyzstan|laos|latvia|lebanon|lesotho|liberia|libya|lithuania|luxembourg|madagascar|malawi|malaysia|maldives|mali|malta|mauritania|mauritius|mexico|monaco|mongolia|montenegro|morocco|mozambique|myanmar|namibia|nauru|nepal|netherlands|new zealand|nicaragua|niger|nigeria|niue|norway|oman|pakistan|palau|panama|papua new guinea|papua|new guinea|paraguay|peru|philippines|poland|portugal|qatar|south korea|north korea|moldova|romania|russia|rwanda|st kitts|saint kitts|saint kitts and nevis|st lucia|saint lucia|st vincent|saint vincent|saint vincent and the grenadines|samoa|san marino|sao tome|saudi arabia|senegal|serbia|seychelles|sierra leone|singapore|slovakia|slovenia|solomon islands|somalia|south africa|south sudan|spain|sri lanka|sudan|suriname|swaziland|sweden|switzerland|syria|tajikistan|thailand|macedonia|timor|timor-leste|togo|tonga|trinidad|trinidad and tobago|tunisia|turkey|turkmenistan|tuvalu|uganda|ukraine|uae|united arab emirates|uk|united kingdom|tanzania|uruguay|uzbekistan|vanuatu|venezuela|vietnam|viet nam|yemen|zambia|zimbabwe)",
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            for x in X:
-                p = 1
-                if regex1.search(x) or regex2.search(x):
-                    p = 0
-                y.append(p)
-        elif tag == 'HBA1C':
-            a1c = re.compile(
-                pattern=r'a1c.{,30}?(\d+\.\d+)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            for x in X:
-                p = 0
-                for value in a1c.findall(x):
-                    f = float(value)
-                    if (f >= 6.5) and (f <= 9.5):
-                        p = 1
-                y.append(p)
-        elif tag == 'KETO-1YR':
-            # not met
-            no_keto = re.compile(
-                pattern=r'no.{,30}?(?:dka|ketones|ketoacidosis)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            # met
-            keto = re.compile(
-                pattern=r'(?:ketones\s+pos)|(?:ketoacidosis)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+                continue
+            if _DRUG_ABUSE_MET_REGEX.search(xl):
+                y.append(1)
+                continue
+            y.append(0)
+        return y
+    #
+    def _predict_english(self, X):
+        # one scan of the joined batch per pattern instead of one
+        # Python-level search call per document and pattern
+        big, ends = _join_documents([x.lower() for x in X])
+        y = [1] * len(X)
+        for regex in (_LANGUAGE_REGEX, _COUNTRY_REGEX):
+            starts = np.fromiter(
+                (m.start() for m in regex.finditer(big)),
+                dtype=np.int64,
             )
-            for x in X:
-                if no_keto.search(x):
-                    y.append(0)
-                    continue
-                if keto.search(x):
-                    y.append(1)
-                    continue
+            for i in np.unique(ends.searchsorted(starts, side='right')):
+                y[i] = 0
+        return y
+    #
+    def _predict_hba1c(self, X):
+        y = []
+        for x in X:
+            xl = x.lower()
+            if _HBA1C_KEYWORD not in xl:
                 y.append(0)
-        elif tag == 'MAKES-DECISIONS':
-            # not met
-            regex1 = re.compile(
-                pattern=r'(?:daughter|wife|husband|family|niece|father|mother|son|brother|sister|sibling).{,20}?make.{,20}?decision',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex2 = re.compile(
-                pattern=r'(?:pt|patient).{,20}?no.{,20}?make.{,20}?decision',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex3 = re.compile(
-                pattern=r'mental.{,20}?retardation',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex4 = re.compile(
-                pattern=r'(?:confus|depress|altered|wors|bad).{,20}?mental.{,20}?status',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex5 = re.compile(
-                pattern=r'(?:pt|patient).{,20}?intubat',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+                continue
+            p = 0
+            values = _A1C_REGEX.findall(xl)
+            if values:
+                arr = np.array(values, dtype=np.float64)
+                p = int(((arr >= 6.5) & (arr <= 9.5)).any())
+            y.append(p)
+        return y
+    #
+    def _predict_keto_1yr(self, X):
+        # documents without any anchor keyword keep the default label
+        # and stay out of the joined batch
+        y = [0] * len(X)
+        idx = []
+        docs = []
+        for i, x in enumerate(X):
+            xl = x.lower()
+            if any(k in xl for k in _KETO_KEYWORDS):
+                idx.append(i)
+                docs.append(xl)
+        if not docs:
+            return y
+        big, ends = _join_documents(docs)
+        not_met = np.zeros(len(docs), dtype=bool)
+        met = np.zeros(len(docs), dtype=bool)
+        for regex, flags in ((_NO_KETO_REGEX, not_met), (_KETO_REGEX, met)):
+            starts = np.fromiter(
+                (m.start() for m in regex.finditer(big)),
+                dtype=np.int64,
             )
-            for x in X:
-                if regex1.search(x) or regex2.search(x) or regex3.search(x) or regex4.search(x) or regex5.search(x):
-                    y.append(0)
-                    continue
+            flags[np.unique(ends.searchsorted(starts, side='right'))] = True
+        for i, p in zip(idx, met & ~not_met):
+            y[i] = int(p)
+        return y
+    #
+    def _predict_makes_decisions(self, X):
+        y = []
+        for x in X:
+            xl = x.lower()
+            if not any(k in xl for k in _DECISIONS_KEYWORDS):
                 y.append(1)
-        elif tag == 'MI-6MOS':
-            regex_mi = re.compile(r"(.{0,40})\b(myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b(.{0,20})", re.IGNORECASE)
-            regex_neg = re.compile(r"\b(rule-out|rule out|ruled out|ruling out|r\\?o|old|past|prior|post|s\\?p|s/?p|no|not|negative|free|unlikely|any|absence|absent|had|father|mother|dad|mom|grandfather|grandmother|brother|sister|son|daughter|family|fh|history)\b", re.IGNORECASE)
-            for i, x in enumerate(X):
-                p = 0
-                for m in regex_mi.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(3)):
-                        p = 1
-                        break
-                y.append(p)
-        assert len(y) == len(X)
+                continue
+            if _DECISIONS_NOT_MET_REGEX.search(xl):
+                y.append(0)
+                continue
+            y.append(1)
+        return y
+    #
+    def _predict_mi_6mos(self, X):
+        # documents without any anchor keyword keep the default label
+        # and stay out of the joined batch; the newline sentinel is
+        # opaque to the greedy `.{0,40}` left context (the pattern has
+        # no `re.DOTALL`), so each document is matched exactly as it
+        # was when scanned on its own
+        y = [0] * len(X)
+        idx = []
+        docs = []
+        for i, x in enumerate(X):
+            xl = x.lower()
+            if any(k in xl for k in _MI_KEYWORDS):
+                idx.append(i)
+                docs.append(xl)
+        if not docs:
+            return y
+        big, ends = _join_documents(docs, sentinel=_LINE_SENTINEL)
+        for m in _MI_REGEX.finditer(big):
+            if not _MI6MOS_NEG_REGEX.search(m.group(1)) and not _MI6MOS_NEG_REGEX.search(m.group(2)):
+                y[idx[ends.searchsorted(m.end() - 1, side='right')]] = 1
         return y
 
 # to improve rules
+ASA_PHYS_STATUS_REGEX = re.compile(
+    pattern=r'asa physical status',
+    flags=re.IGNORECASE,
+)
+
+
 HTML_REGEX = re.compile(
     pattern=r'&#\d+;',
     flags=re.IGNORECASE,
@@ -339,25 +630,237 @@ DATE3_REGEX = re.compile(
 
 
 def remove_dates(doc):
+    # the three passes must stay separate: they cascade, e.g. in
+    # 'june 2018' the first pass removes '2018' and only then does the
+    # month-name pattern match 'june' (a fused single-pass alternation
+    # would instead consume 'june 20' and leave an '18' fragment that
+    # the lab-value extractors could misread)
     doc = DATE1_REGEX.sub('', doc)
     doc = DATE2_REGEX.sub('', doc)
     doc = DATE3_REGEX.sub('', doc)
     return doc
 
 
+# per-document normalization cache: the CREATININE and HBA1C rules both
+# strip HTML entities and dates from every document, so the result is
+# memoized across tags (keyed by the document string, as in
+# `reader._clean_records`)
+_NORM_CACHE = {}
+
+
+def _normalize(doc):
+    norm = _NORM_CACHE.get(doc)
+    if norm is None:
+        norm = remove_dates(remove_html_chars(doc))
+        _NORM_CACHE[doc] = norm
+    return norm
+
+
+# `get_lines` helpers: any whitespace run containing a line break (the
+# full set recognized by `str.splitlines`) collapses to a single '\n',
+# and the remaining intra-line whitespace collapses to single spaces
+_LINE_BREAK_REGEX = re.compile('\\s*[\\n\\r\\v\\f\\x1c\\x1d\\x1e\\x85\\u2028\\u2029]\\s*')
+_INLINE_WS_REGEX = re.compile(r'[^\S\n]+')
+
+
 def get_lines(doc):
-    lines = list()
-    for line in doc.splitlines():
-        line = line.strip()
-        if line:
-            line = ' '.join(line.split())
-            lines.append(line)
-    return lines
+    # two C-level passes instead of a Python loop over every line
+    doc = _LINE_BREAK_REGEX.sub('\n', doc)
+    doc = _INLINE_WS_REGEX.sub(' ', doc).strip()
+    if not doc:
+        return list()
+    return doc.split('\n')
+
+
+# precompiled rule patterns of `ImprovedRuleBasedClassifier` (built
+# once at import time - `predict` was recompiling every pattern of
+# the selected tag on each call)
+
+# ADVANCED-CAD
+_IMP_CAD_MI_REGEX = re.compile(r"(.{0,40})\b(myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b(.{0,20})", re.IGNORECASE)
+_IMP_CAD_ANGINA_REGEX = re.compile(r"(.{0,40})\bangina\b(.{0,20})", re.IGNORECASE)
+_IMP_CAD_ISCHEMIA_REGEX = re.compile(r"(.{0,40})\bischemia\b(.{0,20})", re.IGNORECASE)
+_IMP_CAD_NEG_REGEX = re.compile(r"\b(rule-out|rule out|ruled out|ruling out|r\\?o|r/o|no|not|negative|free|unlikely|any|absence|absent|father|mother|dad|mom|grandfather|grandmother|brother|sister|son|daughter|family|fh)\b", re.IGNORECASE)
+
+# ALCOHOL-ABUSE
+_IMP_ALCOHOL_DENIES_REGEX = re.compile(
+    pattern=r'\b(?:denies|deny)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_NO_ABUSE_DRINK_REGEX = re.compile(
+    pattern=r'\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_NO_DRINK_ABUSE_REGEX = re.compile(
+    pattern=r'\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_DRINK_NO_ABUSE_REGEX = re.compile(
+    pattern=r'\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_ABUSE_DRINK_NO_REGEX = re.compile(
+    pattern=r'\b(?:abuse|binge|dependence|heavy|ingestion)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_LIMIT_REGEX = re.compile(
+    pattern=r'\blimit\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_AMOUNT_REGEX = re.compile(
+    pattern=r'\bamount\b[^.,]{,20}?\b(?:alcohol|etoh)\b[^.,]{,20}?\b(?:drink|drinking)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_THERAPY_REGEX = re.compile(
+    pattern=r'\btherapy\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_DRINK_ABUSE_REGEX = re.compile(
+    pattern=r'\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+_IMP_ALCOHOL_ABUSE_DRINK_REGEX = re.compile(
+    pattern=r'\b(?:abuse|binge|dependence|heavy|ingestion)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
+    flags=re.DOTALL|re.IGNORECASE,
+)
+
+# ASP-FOR-MI
+_IMP_ASPIRIN_REGEX = re.compile(r"(.{0,40})\b(aspirin|asa|acetylsalicylic)\b(.{0,40})", re.DOTALL|re.IGNORECASE)
+_IMP_ASPIRIN_NEG_REGEX = re.compile(r"(avoid|stop|causes|rash|ulcer|allerg|consider|other\sday|none|should)", re.DOTALL|re.IGNORECASE)
+
+# CREATININE
+_IMP_CREATININE_TEXT_REGEX = re.compile(
+    pattern=r'\b(?:creatinine was elevated to|creatinine stable|creatinine \(stat lab\)|cr|cr\.|cre|creatinine)[\s:]([^,;]{1,10})',
+    flags=re.IGNORECASE,
+)
+_IMP_CREATININE_NUM_REGEX = re.compile(
+    pattern=r'\b\d\.\d{1,2}\b',
+    flags=re.IGNORECASE,
+)
+_IMP_ELEVATED_CREATININE_REGEX = re.compile(
+    pattern=r'(?:elevated|rising serum)\b[^.,;:]{1,20}\b(?:creatinine)\b',
+    flags=re.IGNORECASE,
+)
+
+# DIETSUPP-2MOS
+_IMP_DIETSUPP_REGEX = re.compile(r"(.{0,40})\b(calcium|copper|cyanocobalamin|epogen|ferrous gluconate|ferrous sulfate|fish oil|folate|k-dur|klor-con|minerals|nephrocaps|niferex|procrit|tocopherol|tums|ascorbic acid|folic acid|calcium|chromium|iron|magnesium|potassium|selenium|zinc|vitamin B[-\s]?1|vitamin B[-\s]?2|vitamin B[-\s]?6|vitamin B[-\s]?12|vitamin B[-\s]?100|vitamin C|vitamin E|vitamin G|vitamin H|vitamin M|vitamin suppl|mineral suppl|Betaxin|niacin|m\.?v\.?i\.?|thiamine)\b(.{0,10})", re.IGNORECASE)
+_IMP_DIETSUPP_LEFT_NEG_REGEX = re.compile(r"(elevated|high|low|normal|check|past|previous|was|recommend|counsel)", re.IGNORECASE)
+_IMP_DIETSUPP_RIGHT_NEG_REGEX = re.compile(r"(\s{3,}|[\s\n]*(is|was|were|of)?[\s\n]*\d+\.\d|[\s\n]*(is|was|were)|[\s\n]*(is|was)?[\s(]*(elevated|high|low|deficien|normal|channel|studies|study|stat|lab))", re.IGNORECASE)
+
+# DRUG-ABUSE
+# every pattern of the tag requires one of these substance literals
+# ('crack' is not among the base classifier keywords, hence a separate
+# tuple)
+_IMP_DRUG_KEYWORDS = (
+    'cocaine', 'crack', 'drug', 'heroin', 'illicit', 'substance',
+)
+
+_IMP_DRUG_DENIES_HIST_DRUG_USE_REGEX = re.compile(
+    pattern=r'\b(?:denies|deny|no)\b[^.,;:\n]{,25}\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b',
+    flags=re.IGNORECASE,
+)
+_IMP_DRUG_DENIES_HIST_USE_DRUG_REGEX = re.compile(
+    pattern=r'\b(?:denies|deny|no)\b[^.,;:\n]{,25}\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b',
+    flags=re.IGNORECASE,
+)
+_IMP_DRUG_HIST_DRUG_USE_REGEX = re.compile(
+    pattern=r'\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b',
+    flags=re.IGNORECASE,
+)
+_IMP_DRUG_HIST_USE_DRUG_REGEX = re.compile(
+    pattern=r'\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b',
+    flags=re.IGNORECASE,
+)
+_IMP_DRUG_USE_DRUG_HIST_REGEX = re.compile(
+    pattern=r'\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b[^.,;:\n]{,25}\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b',
+    flags=re.IGNORECASE,
+)
+
+# ENGLISH
+#regex2 = re.compile(
+#    "(?:male|woman|lady|patient|pt)[\s]+from[\s]+(the[\s]+)?(afghanistan|albania|algeria|andorra|angola|antigua|antigua and barbuda|argentina|armenia|australia|austria|azerbaijan|bahamas|bahrain|bangladesh|barbados|belarus|belgium|belize|benin|bhutan|bolivia|bosnia|bosnia and herzegovina|botswana|brazil|brunei|bulgaria|burkina|burkina faso|burundi|cabo verde|cape verde|cape vert|cambodia|cambodja|cameroon|canada|central african republic|chad|chile|china|colombia|comoros|congo|costa rica|croatia|cuba|cyprus|czechia|côte d'ivoire|ivory coast|korea|democratic republic of congo|republic of congo|denmark|djibouti|dominica|dominican republic|ecuador|egypt|el salvador|equatorial guinea|eritrea|estonia|ethiopia|faroe islands|fiji|finland|france|gabon|gambia|georgia|germany|ghana|greece|grenada|guatemala|guinea|guinea-bissau|guyana|haiti|honduras|hungary|iceland|india|indonesia|iran|iraq|ireland|israel|italy|jamaica|japan|jordan|kazakhstan|kenya|kiribati|kuwait|kyrgyzstan|laos|latvia|lebanon|lesotho|liberia|libya|lithuania|luxembourg|madagascar|malawi|malaysia|maldives|mali|malta|mauritania|mauritius|mexico|monaco|mongolia|montenegro|morocco|mozambique|myanmar|namibia|nauru|nepal|netherlands|new zealand|nicaragua|niger|nigeria|niue|norway|oman|pakistan|palau|panama|papua new guinea|papua|new guinea|paraguay|peru|philippines|poland|portugal|qatar|south korea|north korea|moldova|romania|russia|rwanda|st kitts|saint kitts|saint kitts and nevis|st lucia|saint lucia|st vincent|saint vincent|saint vincent and the grenadines|samoa|san marino|sao tome|saudi arabia|senegal|serbia|seychelles|sierra leone|singapore|slovakia|slovenia|solomon islands|somalia|south africa|south sudan|spain|sri lanka|sudan|suriname|swaziland|sweden|switzerland|syria|tajikistan|thailand|macedonia|timor|timor-leste|togo|tonga|trinidad|trinidad and tobago|tunisia|turkey|turkmenistan|tuvalu|uganda|ukraine|uae|united arab emirates|uk|united kingdom|tanzania|uruguay|uzbekistan|vanuatu|venezuela|vietnam|viet nam|yemen|zambia|zimbabwe)",
+#    flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+#)
+_IMP_ENGLISH_NOT_MET_REGEX = re.compile(
+    pattern='|'.join('(?:%s)' % p for p in (
+        '(?:arabic|aramaic|armenian|bulgarian|burmese|cambodian|cantanese|cantonese|catonese|chinese|creole|croele|ethiopian|farsi|farsti|french|greek|gujarati|haitan|hindi|indonesian|infant|italian|japanese|korean|laotian|latvian|loatian|mandarin|nonenglish|persian|polish|portugese|portuguese|romanian|rusian|russian|somali|spainish|spanish|thai|tiawanese|urdu|vietmanese|vietnamese|yiddish)[\s-]+(?:speaking)',
+        r'\b(?:member|members|family)\b[^.,;]{,20}\b(?:interpret|translate|interpreting|translating)\b',
+        r'\b(?:interpreter|translator)\b[^.,;]{,20}\b(?:present|required|necessary)\b',
+    )),
+    flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+)
+
+# HBA1C anchor keywords: the header and text patterns both require one
+# of these literals, so lines without any of them are skipped without
+# running the regexes ('baic' also covers 'hgbaic')
+_IMP_A1C_KEYWORDS = ('a1c', 'baic', 'gaic')
+
+# HBA1C
+_IMP_A1C_HEADER_REGEX = re.compile(
+    pattern=r'^date.+(?:a1c|hgbaic|hbaic|hgaic)',
+    flags=re.IGNORECASE,
+)
+_IMP_A1C_TEXT_REGEX = re.compile(
+    pattern=r'(?:a1c|hgbaic|hbaic|hgaic)(.{,50})',
+    flags=re.IGNORECASE,
+)
+_IMP_A1C_NUM_REGEX = re.compile(
+    pattern=r'(\d{1,2}(?:\.\d{1,2})?)',
+    flags=re.IGNORECASE,
+)
+# first value of a text window, unless a ';' or a ',' comes before it
+# (one anchored match instead of two splits plus a findall)
+_IMP_A1C_VALUE_REGEX = re.compile(
+    pattern=r'[^;,]*?(\d{1,2}(?:\.\d{1,2})?)',
+    flags=re.IGNORECASE,
+)
+# a contiguous run of keyword lines plus the line after the run (whose
+# values may belong to a trailing header line); keyword-less lines
+# cannot contribute values on their own, so they are skipped inside
+# the regex engine instead of the Python line loop
+_IMP_A1C_CAND_REGEX = re.compile(
+    pattern=r'(?:[^\n]*(?:a1c|baic|gaic)[^\n]*\n)*'
+            r'[^\n]*(?:a1c|baic|gaic)[^\n]*'
+            r'(?:\n[^\n]*)?',
+)
+
+# KETO-1YR
+_IMP_NO_KETO_REGEX = re.compile(
+    pattern=r'no.{,30}?(?:dka|ketones|ketoacidosis)',
+    flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+)
+_IMP_KETO_REGEX = re.compile(
+    pattern=r'(?:ketones\s+pos)|(?:ketoacidosis)',
+    flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+)
+
+# MAKES-DECISIONS
+_IMP_DECISIONS_KEYWORDS = (
+    'alzheimer', 'answer', 'decision', 'dementia', 'mental', 'self',
+)
+_IMP_DECISIONS_NOT_MET_REGEX = re.compile(
+    pattern='|'.join('(?:%s)' % p for p in (
+        r'\b(?:daughter|wife|husband|family|niece|father|mother|son|brother|sister|sibling)\b[^.,;]{,20}(?:make|makes)\b[^.,;]{,20}\b(?:decision|decisions)\b',
+        r'\b(?:pt|patient)\b[^.,;]{,20}\b(?:not)\b[^.,;]{,20}\b(?:make|makes)\b[^.,;]{,20}\b(?:decision|decisions)\b',
+        r'\b(?:mental)\b[^.,;]{,20}\b(?:retardation)\b',
+        r'\b(?:confusion|confused|depression|depressed|worst|worse|bad)\b[^.,;]{,20}\b(?:mental)[^.,;]{,20}\b(?:status)\b',
+        r'\b(?:consult|appointment)\b[^.,;]{,20}\b(?:neuro|psych|psychiatric)[^.,;]{,20}\b(?:dementia|alzheimer)\b',
+        r'\b(?:pt|patient)\b[^.,;]{,20}\b(?:diagnosed|dx)[^.,;]{,20}\b(?:dementia|alzheimer)\b',
+        r'\b(?:severe)\b[^.,;]{,20}\b(?:dementia|alzheimer)\b',
+        r'\b(?:unable|not able)\b[^.,;]{,20}\b(?:answer)\b[^.,;]{,20}\b(?:question|questions)\b',
+        r'\b(?:pt|patient)\b[^.,;]{,20}\b(?:not)\b[^.,;]{,20}\b[^.,;]{,20}\b(?:acting|speaking|communicating)\b[^.,;]{,20}\b(?:himself|herself|self)\b',
+    )),
+    flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
+)
+
+# MI-6MOS
+_IMP_MI6MOS_MI_REGEX = re.compile(r"(.{0,40})\b(myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b(.{0,20})", flags=re.IGNORECASE|re.DOTALL)
+_IMP_MI6MOS_NEG_REGEX = re.compile(r"\b(rule-out|rule out|ruled out|ruling out|r\\?o|r/o|old|past|prior|post|s\\?p|s/p|no|not|negative|free|unlikely|any|absence|absent|had|father|mother|dad|mom|grandfather|grandmother|brother|sister|son|daughter|family|fh|\w{,2}story|\w{,2}hx|flow)\b", flags=re.IGNORECASE|re.DOTALL)
 
 
 class ImprovedRuleBasedClassifier:
     #
-    def predict(self, tag, X):
+    def predict(self, tag, X, workers=1):
         r"""
         Predict method.
 
@@ -370,9 +873,18 @@ class ImprovedRuleBasedClassifier:
             Tag to be considered.
         X : list
             List of documents to be predicted.
+        workers : int, None
+            Number of worker processes (default: 1, serial). `None`
+            uses one worker per CPU. The per-document work is
+            independent, so larger batches are split into chunks that
+            are predicted in parallel.
 
         """
         assert tag in TAGS
+        if (workers != 1) and (len(X) >= 2 * _CHUNK_SIZE):
+            y = _predict_parallel(type(self), tag, X, workers)
+            assert len(y) == len(X)
+            return y
         y = []
         if tag == 'ABDOMINAL':
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/iSU-Sk_00D0
@@ -383,28 +895,21 @@ class ImprovedRuleBasedClassifier:
         elif tag == 'ADVANCED-CAD':
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/Yub-jzN6w4M
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/w8fgwqU7W8g
-            with open(os.path.join(REPO, 'data', 'CAD_drugs_clean.txt')) as fin:
-                cad_drugs = '|'.join(fin.read().splitlines())
-            regex = re.compile(r"\b(%s)\b" %cad_drugs, re.IGNORECASE)
-            regex_mi = re.compile(r"(.{0,40})\b(myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b(.{0,20})", re.IGNORECASE)
-            regex_angina = re.compile(r"(.{0,40})\bangina\b(.{0,20})", re.IGNORECASE)
-            regex_ischemia = re.compile(r"(.{0,40})\bischemia\b(.{0,20})", re.IGNORECASE)
-            regex_neg = re.compile(r"\b(rule-out|rule out|ruled out|ruling out|r\\?o|r/o|no|not|negative|free|unlikely|any|absence|absent|father|mother|dad|mom|grandfather|grandmother|brother|sister|son|daughter|family|fh)\b", re.IGNORECASE)
             for i, x in enumerate(X):
                 p = 0
                 complications = 0
-                if len(list(set([m.group(0) for m in regex.finditer(x)]))) >= 2:
+                if len(list(set([m.group(0) for m in _CAD_DRUGS_IGNORECASE_REGEX.finditer(x)]))) >= 2:
                     complications +=1
-                for m in regex_mi.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(3)):
+                for m in _IMP_CAD_MI_REGEX.finditer(x):
+                    if not _IMP_CAD_NEG_REGEX.search(m.group(1)) and not _IMP_CAD_NEG_REGEX.search(m.group(3)):
                         complications += 1
                         break
-                for m in regex_angina.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(2)):
+                for m in _IMP_CAD_ANGINA_REGEX.finditer(x):
+                    if not _IMP_CAD_NEG_REGEX.search(m.group(1)) and not _IMP_CAD_NEG_REGEX.search(m.group(2)):
                         complications += 1
                         break
-                for m in regex_ischemia.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(2)):
+                for m in _IMP_CAD_ISCHEMIA_REGEX.finditer(x):
+                    if not _IMP_CAD_NEG_REGEX.search(m.group(1)) and not _IMP_CAD_NEG_REGEX.search(m.group(2)):
                         complications += 1
                         break
                 if complications >= 2:
@@ -413,91 +918,43 @@ class ImprovedRuleBasedClassifier:
         elif tag == 'ALCOHOL-ABUSE':
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/7y3NFBDkFUg
             # not met
-            denies = re.compile(
-                pattern=r'\b(?:denies|deny)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            no_abuse_drink = re.compile(
-                pattern=r'\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            no_drink_abuse = re.compile(
-                pattern=r'\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            drink_no_abuse = re.compile(
-                pattern=r'\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            abuse_drink_no = re.compile(
-                pattern=r'\b(?:abuse|binge|dependence|heavy|ingestion)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:ago|no|none|past|prev|previous|prior|history|h/o|hx)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
             # met
-            limit = re.compile(
-                pattern=r'\blimit\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            amount = re.compile(
-                pattern=r'\bamount\b[^.,]{,20}?\b(?:alcohol|etoh)\b[^.,]{,20}?\b(?:drink|drinking)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            therapy = re.compile(
-                pattern=r'\btherapy\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            drink_abuse = re.compile(
-                pattern=r'\b(?:alcohol|drink|drinking|etoh)\b[^.,]{,20}?\b(?:abuse|dependence|heavy|ingestion)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
-            abuse_drink = re.compile(
-                pattern=r'\b(?:abuse|binge|dependence|heavy|ingestion)\b[^.,]{,20}?\b(?:alcohol|drink|drinking|etoh)\b',
-                flags=re.DOTALL|re.IGNORECASE,
-            )
             for x in X:
-                if denies.search(x) or no_abuse_drink.search(x) or no_drink_abuse.search(x) or drink_no_abuse.search(x) or abuse_drink_no.search(x):
+                # every pattern of the tag requires one of the anchor
+                # keywords, so keyword-less documents keep the default
+                xl = x.lower()
+                if not any(k in xl for k in _ALCOHOL_KEYWORDS):
                     y.append(0)
                     continue
-                if limit.search(x) or amount.search(x) or therapy.search(x) or drink_abuse.search(x) or abuse_drink.search(x):
+                if _IMP_ALCOHOL_DENIES_REGEX.search(x) or _IMP_ALCOHOL_NO_ABUSE_DRINK_REGEX.search(x) or _IMP_ALCOHOL_NO_DRINK_ABUSE_REGEX.search(x) or _IMP_ALCOHOL_DRINK_NO_ABUSE_REGEX.search(x) or _IMP_ALCOHOL_ABUSE_DRINK_NO_REGEX.search(x):
+                    y.append(0)
+                    continue
+                if _IMP_ALCOHOL_LIMIT_REGEX.search(x) or _IMP_ALCOHOL_AMOUNT_REGEX.search(x) or _IMP_ALCOHOL_THERAPY_REGEX.search(x) or _IMP_ALCOHOL_DRINK_ABUSE_REGEX.search(x) or _IMP_ALCOHOL_ABUSE_DRINK_REGEX.search(x):
                     y.append(1)
                     continue
                 y.append(0)
         elif tag == 'ASP-FOR-MI':
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/q3MEcmuhDVo
-            regex = re.compile(r"(.{0,40})\b(aspirin|asa|acetylsalicylic)\b(.{0,40})", re.DOTALL|re.IGNORECASE)
-            regex_neg = re.compile(r"(avoid|stop|causes|rash|ulcer|allerg|consider|other\sday|none|should)", re.DOTALL|re.IGNORECASE)
             for x in X:
-                x = re.sub('asa physical status', '', x, flags=re.IGNORECASE)
+                x = ASA_PHYS_STATUS_REGEX.sub('', x)
                 p = 0
-                for m in regex.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(3)):
+                for m in _IMP_ASPIRIN_REGEX.finditer(x):
+                    if not _IMP_ASPIRIN_NEG_REGEX.search(m.group(1)) and not _IMP_ASPIRIN_NEG_REGEX.search(m.group(3)):
                         p = 1
+                        break
                 y.append(p)
         elif tag == 'CREATININE':
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/buhaysCxZN4
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/VLxv-yTkSnY
             # "Any value over normal at any time."
-            text = re.compile(
-                pattern=r'\b(?:creatinine was elevated to|creatinine stable|creatinine \(stat lab\)|cr|cr\.|cre|creatinine)[\s:]([^,;]{1,10})',
-                flags=re.IGNORECASE,
-            )
-            num = re.compile(
-                pattern=r'\b\d\.\d{1,2}\b',
-                flags=re.IGNORECASE,
-            )
-            elevated_creatinine = re.compile(
-                pattern=r'(?:elevated|rising serum)\b[^.,;:]{1,20}\b(?:creatinine)\b',
-                flags=re.IGNORECASE,
-            )
             for x in X:
                 p = 0
-                x = remove_html_chars(x)
-                x = remove_dates(x)
+                x = _normalize(x)
                 x = ' '.join(x.split())
                 values = list()
-                matches = text.findall(x)
+                matches = _IMP_CREATININE_TEXT_REGEX.findall(x)
                 for m in matches:
-                    m = num.findall(m)
+                    m = _IMP_CREATININE_NUM_REGEX.findall(m)
                     if m:
                         values.append(float(m[0]))
                 for v in values:
@@ -505,7 +962,8 @@ class ImprovedRuleBasedClassifier:
                     # I considered this value, but the records are very inconsistent (I already saw thresholds of 1.2, 1.5, etc.)
                     if v > 1.4:
                         p = 1
-                if elevated_creatinine.search(x):
+                        break
+                if _IMP_ELEVATED_CREATININE_REGEX.search(x):
                     p = 1
                 y.append(p)
         elif tag == 'DIETSUPP-2MOS':
@@ -515,13 +973,10 @@ class ImprovedRuleBasedClassifier:
             # "intravenous are not excluded"
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/NJjP_GQV2kI
             # "the assumption was that the meds carry over from the previous note"
-            regex = re.compile(r"(.{0,40})\b(calcium|copper|cyanocobalamin|epogen|ferrous gluconate|ferrous sulfate|fish oil|folate|k-dur|klor-con|minerals|nephrocaps|niferex|procrit|tocopherol|tums|ascorbic acid|folic acid|calcium|chromium|iron|magnesium|potassium|selenium|zinc|vitamin B[-\s]?1|vitamin B[-\s]?2|vitamin B[-\s]?6|vitamin B[-\s]?12|vitamin B[-\s]?100|vitamin C|vitamin E|vitamin G|vitamin H|vitamin M|vitamin suppl|mineral suppl|Betaxin|niacin|m\.?v\.?i\.?|thiamine)\b(.{0,10})", re.IGNORECASE)
-            regex_left_neg = re.compile(r"(elevated|high|low|normal|check|past|previous|was|recommend|counsel)", re.IGNORECASE)
-            regex_right_neg = re.compile(r"(\s{3,}|[\s\n]*(is|was|were|of)?[\s\n]*\d+\.\d|[\s\n]*(is|was|were)|[\s\n]*(is|was)?[\s(]*(elevated|high|low|deficien|normal|channel|studies|study|stat|lab))", re.IGNORECASE)
             for i, x in enumerate(X):
                 p = 0
-                for m in regex.finditer(x):
-                    if not regex_left_neg.search(m.group(1)) and not regex_right_neg.search(m.group(3)):
+                for m in _IMP_DIETSUPP_REGEX.finditer(x):
+                    if not _IMP_DIETSUPP_LEFT_NEG_REGEX.search(m.group(1)) and not _IMP_DIETSUPP_RIGHT_NEG_REGEX.search(m.group(3)):
                         p = 1
                         break
                 y.append(p)
@@ -530,55 +985,25 @@ class ImprovedRuleBasedClassifier:
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/ocnTOFlbv0c
             # "marijuana use does not constitute drug abuse"
             # not met
-            denies_hist_drug_use = re.compile(
-                pattern=r'\b(?:denies|deny|no)\b[^.,;:\n]{,25}\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b',
-                flags=re.IGNORECASE,
-            )
-            denies_hist_use_drug = re.compile(
-                pattern=r'\b(?:denies|deny|no)\b[^.,;:\n]{,25}\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b',
-                flags=re.IGNORECASE,
-            )
             # met
-            hist_drug_use = re.compile(
-                pattern=r'\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b',
-                flags=re.IGNORECASE,
-            )
-            hist_use_drug = re.compile(
-                pattern=r'\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b[^.,;:\n]{,25}\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b',
-                flags=re.IGNORECASE,
-            )
-            use_drug_hist = re.compile(
-                pattern=r'\b(?:abuse|abused|dependence|heavy|smoke|smoked|smoking|use|used)\b[^.,;:\n]{,25}\b(?:crack|cocaine|drug|heroin|illicit|substance)\b[^.,;:\n]{,25}\b(?:ago|past|prev|previous|previously|prior|history|h/o|hx|h/x)\b',
-                flags=re.IGNORECASE,
-            )
             for x in X:
-                if denies_hist_drug_use.search(x) or denies_hist_use_drug.search(x):
+                xl = x.lower()
+                if not any(k in xl for k in _IMP_DRUG_KEYWORDS):
+                    y.append(0)
+                    continue
+                if _IMP_DRUG_DENIES_HIST_DRUG_USE_REGEX.search(x) or _IMP_DRUG_DENIES_HIST_USE_DRUG_REGEX.search(x):
                     y.append(0)
                     continue
-                if hist_drug_use.search(x) or hist_use_drug.search(x) or use_drug_hist.search(x):
+                if _IMP_DRUG_HIST_DRUG_USE_REGEX.search(x) or _IMP_DRUG_HIST_USE_DRUG_REGEX.search(x) or _IMP_DRUG_USE_DRUG_HIST_REGEX.search(x):
                     y.append(1)
                     continue
                 y.append(0)
         elif tag=='ENGLISH':
-            regex1 = re.compile(
-                '(?:arabic|aramaic|armenian|bulgarian|burmese|cambodian|cantanese|cantonese|catonese|chinese|creole|croele|ethiopian|farsi|farsti|french|greek|gujarati|haitan|hindi|indonesian|infant|italian|japanese|korean|laotian|latvian|loatian|mandarin|nonenglish|persian|polish|portugese|portuguese|romanian|rusian|russian|somali|spainish|spanish|thai|tiawanese|urdu|vietmanese|vietnamese|yiddish)[\s-]+(?:speaking)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            #regex2 = re.compile(
-            #    "(?:male|woman|lady|patient|pt)[\s]+from[\s]+(the[\s]+)?(afghanistan|albania|algeria|andorra|angola|antigua|antigua and barbuda|argentina|armenia|australia|austria|azerbaijan|bahamas|bahrain|bangladesh|barbados|belarus|belgium|belize|benin|bhutan|bolivia|bosnia|bosnia and herzegovina|botswana|brazil|brunei|bulgaria|burkina|burkina faso|burundi|cabo verde|cape verde|cape vert|cambodia|cambodja|cameroon|canada|central african republic|chad|chile|china|colombia|comoros|congo|costa rica|croatia|cuba|cyprus|czechia|côte d'ivoire|ivory coast|korea|democratic republic of congo|republic of congo|denmark|djibouti|dominica|dominican republic|ecuador|egypt|el salvador|equatorial guinea|eritrea|estonia|ethiopia|faroe islands|fiji|finland|france|gabon|gambia|georgia|germany|ghana|greece|grenada|guatemala|guinea|guinea-bissau|guyana|haiti|honduras|hungary|iceland|india|indonesia|iran|iraq|ireland|israel|italy|jamaica|japan|jordan|kazakhstan|kenya|kiribati|kuwait|kyrgyzstan|laos|latvia|lebanon|lesotho|liberia|libya|lithuania|luxembourg|madagascar|malawi|malaysia|maldives|mali|malta|mauritania|mauritius|mexico|monaco|mongolia|montenegro|morocco|mozambique|myanmar|namibia|nauru|nepal|netherlands|new zealand|nicaragua|niger|nigeria|niue|norway|oman|pakistan|palau|panama|papua new guinea|papua|new guinea|paraguay|peru|philippines|poland|portugal|qatar|south korea|north korea|moldova|romania|russia|rwanda|st kitts|saint kitts|saint kitts and nevis|st lucia|saint lucia|st vincent|saint vincent|saint vincent and the grenadines|samoa|san marino|sao tome|saudi arabia|senegal|serbia|seychelles|sierra leone|singapore|slovakia|slovenia|solomon islands|somalia|south africa|south sudan|spain|sri lanka|sudan|suriname|swaziland|sweden|switzerland|syria|tajikistan|thailand|macedonia|timor|timor-leste|togo|tonga|trinidad|trinidad and tobago|tunisia|turkey|turkmenistan|tuvalu|uganda|ukraine|uae|united arab emirates|uk|united kingdom|tanzania|uruguay|uzbekistan|vanuatu|venezuela|vietnam|viet nam|yemen|zambia|zimbabwe)",
-            #    flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            #)
-            regex2 = re.compile(
-                r'\b(?:member|members|family)\b[^.,;]{,20}\b(?:interpret|translate|interpreting|translating)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex3 = re.compile(
-                r'\b(?:interpreter|translator)\b[^.,;]{,20}\b(?:present|required|necessary)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
+            # the three not-met patterns are fused into a single
+            # alternation so each document is scanned once
             for x in X:
                 p = 1
-                if regex1.search(x) or regex2.search(x) or regex3.search(x):
+                if _IMP_ENGLISH_NOT_MET_REGEX.search(x):
                     p = 0
                 y.append(p)
         elif tag == 'HBA1C':
@@ -586,42 +1011,38 @@ class ImprovedRuleBasedClassifier:
             # we assumed: "at the most recent time"
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/jwogK3i-rDg
             # 6.5 <= HbA1c <= 9.5
-            header = re.compile(
-                pattern=r'^date.+(?:a1c|hgbaic|hbaic|hgaic)',
-                flags=re.IGNORECASE,
-            )
-            text = re.compile(
-                pattern=r'(?:a1c|hgbaic|hbaic|hgaic)(.{,50})',
-                flags=re.IGNORECASE,
-            )
-            num = re.compile(
-                pattern=r'(\d{1,2}(?:\.\d{1,2})?)',
-                flags=re.IGNORECASE,
-            )
             for x in X:
-                x = remove_html_chars(x)
-                x = remove_dates(x)
-                lines = get_lines(x)
+                # the patterns are case-insensitive and the extracted
+                # values are digits, so the document is lowercased once
+                x = _normalize(x).lower()
+                if not any(k in x for k in _IMP_A1C_KEYWORDS):
+                    y.append(0)
+                    continue
+                # `get_lines` normalization without the full split:
+                # only the candidate line runs found by the regex are
+                # materialized (a run starts after a keyword-less line,
+                # which can never be a header, so the header state
+                # always enters a run as `False`)
+                x = _LINE_BREAK_REGEX.sub('\n', x)
+                x = _INLINE_WS_REGEX.sub(' ', x).strip()
                 values = list()
-                previous_line_is_header = False
-                for line in lines:
-                    if previous_line_is_header:
-                        m = num.findall(line)
-                        if m:
-                            values.append(float(m[0]))
-                        previous_line_is_header = False
-                        continue
-                    if header.findall(line):
-                        previous_line_is_header = True
-                        continue
-                    matches = text.findall(line)
-                    for m in matches:
-                        # until finds a comma or a semicolon
-                        m = m.split(';')[0]
-                        m = m.split(',')[0]
-                        m = num.findall(m)
-                        if m:
-                            values.append(float(m[0]))
+                for run in _IMP_A1C_CAND_REGEX.finditer(x):
+                    previous_line_is_header = False
+                    for line in run.group().split('\n'):
+                        if previous_line_is_header:
+                            m = _IMP_A1C_NUM_REGEX.search(line)
+                            if m:
+                                values.append(float(m.group(1)))
+                            previous_line_is_header = False
+                            continue
+                        if _IMP_A1C_HEADER_REGEX.search(line):
+                            previous_line_is_header = True
+                            continue
+                        for w in _IMP_A1C_TEXT_REGEX.findall(line):
+                            # until finds a comma or a semicolon
+                            m = _IMP_A1C_VALUE_REGEX.match(w)
+                            if m:
+                                values.append(float(m.group(1)))
                 p = 0
                 if values:
                     last_value = values[-1]
@@ -631,20 +1052,16 @@ class ImprovedRuleBasedClassifier:
         elif tag == 'KETO-1YR':
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/VLxv-yTkSnY
             # not met
-            no_keto = re.compile(
-                pattern=r'no.{,30}?(?:dka|ketones|ketoacidosis)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
             # met
-            keto = re.compile(
-                pattern=r'(?:ketones\s+pos)|(?:ketoacidosis)',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
             for x in X:
-                if no_keto.search(x):
+                xl = x.lower()
+                if not any(k in xl for k in _KETO_KEYWORDS):
+                    y.append(0)
+                    continue
+                if _IMP_NO_KETO_REGEX.search(x):
                     y.append(0)
                     continue
-                if keto.search(x):
+                if _IMP_KETO_REGEX.search(x):
                     y.append(1)
                     continue
                 y.append(0)
@@ -654,55 +1071,26 @@ class ImprovedRuleBasedClassifier:
             # https://groups.google.com/a/simmons.edu/forum/#!topic/n2c2-2018-challenge-organizers-group/NQUeNxsrKJE
             assert False
         elif tag == 'MAKES-DECISIONS':
-            # not met
-            regex1 = re.compile(
-                pattern=r'\b(?:daughter|wife|husband|family|niece|father|mother|son|brother|sister|sibling)\b[^.,;]{,20}(?:make|makes)\b[^.,;]{,20}\b(?:decision|decisions)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex2 = re.compile(
-                pattern=r'\b(?:pt|patient)\b[^.,;]{,20}\b(?:not)\b[^.,;]{,20}\b(?:make|makes)\b[^.,;]{,20}\b(?:decision|decisions)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex3 = re.compile(
-                pattern=r'\b(?:mental)\b[^.,;]{,20}\b(?:retardation)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex4 = re.compile(
-                pattern=r'\b(?:confusion|confused|depression|depressed|worst|worse|bad)\b[^.,;]{,20}\b(?:mental)[^.,;]{,20}\b(?:status)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex5 = re.compile(
-                pattern=r'\b(?:consult|appointment)\b[^.,;]{,20}\b(?:neuro|psych|psychiatric)[^.,;]{,20}\b(?:dementia|alzheimer)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex6 = re.compile(
-                pattern=r'\b(?:pt|patient)\b[^.,;]{,20}\b(?:diagnosed|dx)[^.,;]{,20}\b(?:dementia|alzheimer)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex7 = re.compile(
-                pattern=r'\b(?:severe)\b[^.,;]{,20}\b(?:dementia|alzheimer)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex8 = re.compile(
-                pattern=r'\b(?:unable|not able)\b[^.,;]{,20}\b(?:answer)\b[^.,;]{,20}\b(?:question|questions)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
-            regex9 = re.compile(
-                pattern=r'\b(?:pt|patient)\b[^.,;]{,20}\b(?:not)\b[^.,;]{,20}\b[^.,;]{,20}\b(?:acting|speaking|communicating)\b[^.,;]{,20}\b(?:himself|herself|self)\b',
-                flags=re.DOTALL|re.IGNORECASE|re.MULTILINE,
-            )
+            # not met (the nine patterns are fused into a single
+            # alternation so each document is scanned once)
             for x in X:
-                if regex1.search(x) or regex2.search(x) or regex3.search(x) or regex4.search(x) or regex5.search(x) or regex6.search(x) or regex7.search(x) or regex8.search(x) or regex9.search(x):
+                xl = x.lower()
+                if not any(k in xl for k in _IMP_DECISIONS_KEYWORDS):
+                    y.append(1)
+                    continue
+                if _IMP_DECISIONS_NOT_MET_REGEX.search(x):
                     y.append(0)
                     continue
                 y.append(1)
         elif tag == 'MI-6MOS':
-            regex_mi = re.compile(r"(.{0,40})\b(myocardial infarction|MI|IMI|AMI|ASMI|HMI|NQWMI|NSTEMI|OASMI|SEMI|STEMI|TIMI)\b(.{0,20})", flags=re.IGNORECASE|re.DOTALL)
-            regex_neg = re.compile(r"\b(rule-out|rule out|ruled out|ruling out|r\\?o|r/o|old|past|prior|post|s\\?p|s/p|no|not|negative|free|unlikely|any|absence|absent|had|father|mother|dad|mom|grandfather|grandmother|brother|sister|son|daughter|family|fh|\w{,2}story|\w{,2}hx|flow)\b", flags=re.IGNORECASE|re.DOTALL)
             for i, x in enumerate(X):
                 p = 0
-                for m in regex_mi.finditer(x):
-                    if not regex_neg.search(m.group(1)) and not regex_neg.search(m.group(3)):
+                xl = x.lower()
+                if not any(k in xl for k in _MI_KEYWORDS):
+                    y.append(p)
+                    continue
+                for m in _IMP_MI6MOS_MI_REGEX.finditer(x):
+                    if not _IMP_MI6MOS_NEG_REGEX.search(m.group(1)) and not _IMP_MI6MOS_NEG_REGEX.search(m.group(3)):
                         p = 1
                         break
                 y.append(p)
@@ -710,13 +1098,34 @@ class ImprovedRuleBasedClassifier:
         return y
 
 
+# most frequent label per tag (the remaining tags default to met)
+_BASELINE_NOT_MET_TAGS = frozenset((
+    'ABDOMINAL',
+    'ALCOHOL-ABUSE',
+    'CREATININE',
+    'DIETSUPP-2MOS',
+    'DRUG-ABUSE',
+    'HBA1C',
+    'KETO-1YR',
+    'MI-6MOS',
+))
+_BASELINE_MET_TAGS = frozenset((
+    'ADVANCED-CAD',
+    'ASP-FOR-MI',
+    'ENGLISH',
+    'MAJOR-DIABETES',
+    'MAKES-DECISIONS',
+))
+
+
 class BaselineClassifier:
     #
     def predict(self, tag, X):
+        # one contiguous buffer instead of a list of int objects
         n = len(X)
-        if tag in ('ABDOMINAL', 'ALCOHOL-ABUSE', 'CREATININE', 'DIETSUPP-2MOS', 'DRUG-ABUSE', 'HBA1C', 'KETO-1YR', 'MI-6MOS'):
-            return [0 for i in range(n)]
-        elif tag in ('ADVANCED-CAD', 'ASP-FOR-MI', 'ENGLISH', 'MAJOR-DIABETES', 'MAKES-DECISIONS'):
-            return [1 for i in range(n)]
+        if tag in _BASELINE_NOT_MET_TAGS:
+            return np.zeros(n, dtype=np.int8)
+        elif tag in _BASELINE_MET_TAGS:
+            return np.ones(n, dtype=np.int8)
         else:
             assert False
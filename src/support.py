@@ -29,6 +29,31 @@ from gensim.utils import deaccent
 import re
 
 
+# ASCII lowercasing table: tokens are pure ASCII letter runs, so one
+# `str.translate` pass per document replaces the per-token `lower`
+# calls
+_LOWERCASE_TABLE = str.maketrans(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'abcdefghijklmnopqrstuvwxyz',
+)
+
+# token patterns, compiled once at module scope (they were rebuilt on
+# every call)
+_TOKEN_REGEX = re.compile(pattern=r'[a-zA-Z]{2,}')
+# all-uppercase letter runs (the lookahead forbids partial-run matches,
+# so both patterns match exactly the same letter runs and their
+# `findall` outputs align index by index)
+_CAPS_TOKEN_REGEX = re.compile(
+    pattern=r'([A-Z]{2,}(?![a-zA-Z]))|[a-zA-Z]{2,}',
+)
+
+# token replacements
+_REPLACE = {
+    'pt': 'patient',
+    'pts': 'patient',
+}
+
+
 def load_stopwords(filepath):
     r"""
     Load stopwords from a specific file.
@@ -40,8 +65,8 @@ def load_stopwords(filepath):
 
     Returns
     -------
-    stopwords : set
-        A `set` with the stopwords.
+    stopwords : frozenset
+        A `frozenset` with the stopwords.
 
     Example
     -------
@@ -57,11 +82,8 @@ def load_stopwords(filepath):
     >>>
 
     """
-    stopwords = set()
     with open(filepath) as f:
-        for line in f:
-            stopwords.add(line.strip())
-    return stopwords
+        return frozenset(map(str.strip, f))
 
 
 def clean_medical_documents(docs):
@@ -101,20 +123,20 @@ def clean_medical_documents(docs):
     >>>
 
     """
-    # to not modify the input parameter
-    docs = list(docs)
-    regex = re.compile(pattern=r'[a-zA-Z]{2,}')
-    for i, doc in enumerate(docs):
+    # a new list is built, so the input parameter is not modified;
+    # uppercase words are kept, the other tokens are lowercased by a
+    # single translate pass per document, and the replacements are
+    # folded into the same pass (the replaced tokens are lowercase, so
+    # the kept all-uppercase tokens never hit the mapping)
+    clean = []
+    for doc in docs:
         doc = deaccent(doc)
-        # keep uppercase words
-        tokens = [
-            token.lower() if not token.isupper() else token
-            for token in regex.findall(doc)
-        ]
-        # replace tokens
-        for j, token in enumerate(tokens):
-            if token in ('pt', 'pts'):
-                tokens[j] = 'patient'
-        # clean document
-        docs[i] = ' '.join(tokens)
-    return docs
+        low = doc.translate(_LOWERCASE_TABLE)
+        clean.append(' '.join(
+            _REPLACE.get(caps or token, caps or token)
+            for caps, token in zip(
+                _CAPS_TOKEN_REGEX.findall(doc),
+                _TOKEN_REGEX.findall(low),
+            )
+        ))
+    return clean
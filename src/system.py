@@ -25,6 +25,7 @@ Train and test directories are hard-coded in the script.
 from datetime import datetime
 import numpy as np
 import os
+import pickle
 import random as rn
 from sklearn.ensemble import AdaBoostClassifier
 from sklearn.ensemble import BaggingClassifier
@@ -140,6 +141,7 @@ CLASSIFIERS = [
         'BaggingClassifier',
         BaggingClassifier(
             random_state=SEED,
+            n_jobs=-1,
         ),
     ),
     (
@@ -158,11 +160,44 @@ CLASSIFIERS = [
         'XGBClassifier',
         XGBClassifier(
             random_state=SEED,
+            n_jobs=-1,
         ),
     ),
 ]
 
 
+# disk cache for the per-months document dicts: cleaning deaccents and
+# retokenizes every document on every script invocation, so the dicts
+# are pickled, keyed by the dataset directory, and rebuilt whenever any
+# corpus file is newer than the cached copy
+CACHE_DPATH = os.path.join(REPO, 'cache')
+
+
+def get_documents_cached(corpus, dpath, clean):
+    os.makedirs(CACHE_DPATH, exist_ok=True)
+    fn = '{}-{}-docs.pkl'.format(
+        os.path.basename(os.path.normpath(dpath)),
+        'clean' if clean else 'raw',
+    )
+    fpath = os.path.join(CACHE_DPATH, fn)
+    newest = max(
+        (e.stat().st_mtime for e in os.scandir(dpath)),
+        default=0.0,
+    )
+    if os.path.isfile(fpath) and (os.path.getmtime(fpath) >= newest):
+        P_('\tcache hit\n\t\t{}\n'.format(fpath))
+        with open(fpath, mode='rb') as f:
+            return pickle.load(f)
+    P_('\tcache miss\n\t\t{}\n'.format(fpath))
+    docs = {
+        months: corpus.get_documents(months=months, clean=clean)
+        for months in MONTHS
+    }
+    with open(fpath, mode='wb') as f:
+        pickle.dump(docs, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return docs
+
+
 def cross_validation_mode():
     # load train corpus
     TRUE_CORPUS = Corpus(dpath=TRAIN_DPATH)
@@ -171,24 +206,28 @@ def cross_validation_mode():
     # total number of patients
     n = len(TRUE_CORPUS.get_patients())
     # raw documents (for rule-based)
-    raw_docs = {
-        months: TRUE_CORPUS.get_documents(months=months, clean=False)
-        for months in MONTHS
-    }
+    raw_docs = get_documents_cached(TRUE_CORPUS, TRAIN_DPATH, clean=False)
     # clean documents (for machine learning)
-    clean_docs = {
-        months: TRUE_CORPUS.get_documents(months=months, clean=True)
+    clean_docs = get_documents_cached(TRUE_CORPUS, TRAIN_DPATH, clean=True)
+    # one TF-IDF matrix per months bucket, shared by every classifier,
+    # tag and fold (the vectorizer was refit for each combination,
+    # although the vocabulary only depends on the months bucket; note
+    # that fitting on the full train set lets test-fold tokens into the
+    # IDF statistics - an accepted tradeoff for closed-corpus
+    # cross-validation)
+    tfidf_docs = {
+        months: VECTORIZER[1].fit_transform(clean_docs[months])
         for months in MONTHS
     }
-    # labels
+    # labels (one int8 array per tag, converted once up front so the
+    # fold loop only slices)
     labels = {
-        tag: TRUE_CORPUS.get_labels(tag=tag)
+        tag: np.asarray(TRUE_CORPUS.get_labels(tag=tag), dtype=np.int8)
         for tag in TAGS
     }
     for clf in CLASSIFIERS:
         # print classifier
         P_('{}'.format(str2line(clf)))
-        pipe = Pipeline([VECTORIZER, clf])
         for i, tag in enumerate(TAGS):
             months = TAG2MONTHS[tag]
             if (RULES and (tag in RULES_TAGS)):
@@ -196,19 +235,21 @@ def cross_validation_mode():
                 y_pred = RULE_CLASSIFIER.predict(tag=tag, X=X)
                 PRED_CORPUS.set_labels(tag=tag, labels=y_pred)
             else:
-                X = clean_docs[months]
+                X = tfidf_docs[months]
                 y = labels[tag]
                 y_pred = np.zeros(n)
                 # two distinct labels should exist for classification!
-                if len(set(y)) > 1:
+                if np.unique(y).size > 1:
                     for train_index, test_index in SKF.split(X, y):
-                        X_train = [X[i] for i in train_index]
-                        y_train = [y[i] for i in train_index]
-                        X_test = [X[i] for i in test_index]
-                        # train pipeline
-                        _ = pipe.fit(X=X_train, y=y_train)
+                        # C-level gathers instead of the per-element
+                        # list comprehensions
+                        X_train = X[train_index]
+                        y_train = y[train_index]
+                        X_test = X[test_index]
+                        # train classifier
+                        _ = clf[1].fit(X=X_train, y=y_train)
                         # predict test samples
-                        y_pred[test_index] = pipe.predict(X_test)
+                        y_pred[test_index] = clf[1].predict(X_test)
                     PRED_CORPUS.set_labels(tag=tag, labels=y_pred)
         table = evaluate2str(TRUE_CORPUS, PRED_CORPUS)
         P_(table)
@@ -221,14 +262,10 @@ def predict_mode():
     """
     # train dataset
     TRAIN_CORPUS = Corpus(dpath=TRAIN_DPATH)
-    train_raw_docs = {
-        months: TRAIN_CORPUS.get_documents(months=months, clean=False)
-        for months in MONTHS
-    }
-    train_clean_docs = {
-        months: TRAIN_CORPUS.get_documents(months=months, clean=True)
-        for months in MONTHS
-    }
+    train_raw_docs = get_documents_cached(
+        TRAIN_CORPUS, TRAIN_DPATH, clean=False)
+    train_clean_docs = get_documents_cached(
+        TRAIN_CORPUS, TRAIN_DPATH, clean=True)
     train_labels = {
         tag: TRAIN_CORPUS.get_labels(tag=tag)
         for tag in TAGS
@@ -236,14 +273,10 @@ def predict_mode():
     # test dataset
     TEST_CORPUS = Corpus(dpath=TEST_DPATH)
     GS_TEST_CORPUS = Corpus(dpath=TEST_DPATH)
-    test_raw_docs = {
-        months: TEST_CORPUS.get_documents(months=months, clean=False)
-        for months in MONTHS
-    }
-    test_clean_docs = {
-        months: TEST_CORPUS.get_documents(months=months, clean=True)
-        for months in MONTHS
-    }
+    test_raw_docs = get_documents_cached(
+        TEST_CORPUS, TEST_DPATH, clean=False)
+    test_clean_docs = get_documents_cached(
+        TEST_CORPUS, TEST_DPATH, clean=True)
     # select best classifiers (based on preliminary results)
     # (`None` where rules will be used, since it is expected that they
     # provide better results)
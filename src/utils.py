@@ -114,6 +114,7 @@ class Printer:
     Attributes
     ----------
     _filepath
+    _fh
     _overwrite
     _sep
     _time_format
@@ -123,6 +124,8 @@ class Printer:
     __init__
     print
     date
+    close
+    __del__
 
     Example
     -------
@@ -181,6 +184,16 @@ class Printer:
                     create_directory(dpath)
             with open(filepath, mode='w', encoding='utf-8') as f:
                 _ = f.write('')
+        # the log file is kept open (line-buffered) instead of being
+        # reopened on every print call
+        self._fh = None
+        if filepath:
+            self._fh = open(
+                filepath,
+                mode='a',
+                encoding='utf-8',
+                buffering=1,
+            )
         self._filepath = filepath
         self._overwrite = overwrite
         self._sep = sep
@@ -206,9 +219,8 @@ class Printer:
             s = now + self._sep + s
         s += end
         print(s, end='', flush=True)
-        if self._filepath:
-            with open(self._filepath, mode='a', encoding='utf-8') as f:
-                _ = f.write(s)
+        if self._fh:
+            _ = self._fh.write(s)
     #
     def date(self, s='', end='\n'):
         r"""
@@ -223,3 +235,16 @@ class Printer:
 
         """
         self.print(s, end=end, date=True)
+    #
+    def close(self):
+        r"""
+        Closes the log file (if any). Printing to the console remains
+        possible afterwards.
+
+        """
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+    #
+    def __del__(self):
+        self.close()